@@ -0,0 +1,101 @@
+"""
+Interleaved throughput of game ingestion on one event loop: blocking vs async database access.
+
+K simulated generations share one event loop. Each streams a story from a stub LLM with latency
+and then ingests a recorded game into its own schema:
+
+  blocking  - ingestion with the synchronous run_queries_in_schema (the old workflow behaviour)
+  async     - ingestion with run_queries_in_schema_async on the shared pool
+  flows     - K full MysteryFlow runs gathered on the loop (current workflow code)
+
+Needs a local MySQL configured like benchmarks/loadtest.py. Run from the repository root:
+
+    python -m benchmarks.bench_async_db --flows 1 10 25 --llm-latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from pymysql.err import ProgrammingError
+from utils.async_db import run_queries_in_schema_async, close_pool
+from utils.llm_client import astream_in_thread
+from utils.utils import create_schema_and_tables, run_queries_in_schema, get_connection
+from utils.workflow import run_workflow, delete_queries
+from benchmarks.common import load_fixture, fixture_llm
+
+
+async def generate(schema_name: str, llm, queries: list, blocking: bool):
+    story = ""
+    async for chunk in astream_in_thread(lambda: llm.stream_complete("Write an engaging and creative story")):
+        story += chunk.delta
+
+    if blocking:
+        run_queries_in_schema(schema_name=schema_name, query_list=queries)
+    else:
+        await run_queries_in_schema_async(schema_name=schema_name, query_list=queries)
+
+
+async def run_mode(mode: str, schemas: list, fixture: dict, llm_latency: float) -> float:
+    queries = [q["query"] for q in json.loads(fixture["output"])["queries"]]
+    llm = fixture_llm(fixture, latency=llm_latency)
+
+    start = time.perf_counter()
+    try:
+        if mode == "flows":
+            await asyncio.gather(*(run_workflow(schema_name=schema, llm=llm, verbose=False, close_db_pool=False)
+                                   for schema in schemas))
+        else:
+            await asyncio.gather(*(generate(schema, llm, queries, blocking=mode == "blocking")
+                                   for schema in schemas))
+        return time.perf_counter() - start
+    finally:
+        await close_pool()
+
+
+def reset_schemas(schemas: list):
+    for schema in schemas:
+        try:
+            create_schema_and_tables(schema_name=schema)
+        except ProgrammingError:
+            run_queries_in_schema(schema_name=schema, query_list=delete_queries)
+
+
+def drop_schemas(schemas: list):
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            for schema in schemas:
+                cursor.execute(f"DROP SCHEMA IF EXISTS `{schema}`;")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", type=int, nargs="+", default=[1, 10, 25])
+    parser.add_argument("--modes", nargs="+", default=["blocking", "async", "flows"])
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--fixture", default="game_medium")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    fixture = load_fixture(args.fixture)
+    results = []
+
+    for flows in args.flows:
+        schemas = [f"bench_async_{uuid.uuid4().hex[:8]}_{i}" for i in range(flows)]
+        try:
+            for mode in args.modes:
+                reset_schemas(schemas)
+                wall = asyncio.run(run_mode(mode, schemas, fixture, args.llm_latency))
+                results.append({"flows": flows, "mode": mode, "wall_s": round(wall, 3),
+                                "flows_per_s": round(flows / wall, 3)})
+                print(f"{flows:>4} flows  {mode:<9} {wall:>8.3f}s  {flows / wall:>8.3f} flows/s")
+        finally:
+            drop_schemas(schemas)
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
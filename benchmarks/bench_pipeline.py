@@ -0,0 +1,193 @@
+"""
+Reproducible benchmark of the game generation pipeline stages.
+
+Uses the recorded LLM outputs in benchmarks/fixtures (small, medium, large and a malformed one that
+forces `self_correct`). Validation stages run without external services; the database stages and the
+end-to-end MysteryFlow run need a local MySQL (configured like benchmarks/loadtest.py) and `--db`.
+Run from the repository root:
+
+    python -m benchmarks.bench_pipeline --json bench_current.json
+    python -m benchmarks.bench_pipeline --db --json bench_current.json --compare bench_baseline.json
+
+Results are written as JSON with the commit they were measured on. With `--compare`, stages whose
+median got slower than `--threshold` x the baseline (and by more than `--min-delta-ms`) are reported
+and the exit code is 1.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from utils.prompts import build_reflection_prompt
+from utils.utils import (clean_string, is_valid_sql, is_non_destructive, get_connection,
+                         create_schema_and_tables, run_queries_in_schema)
+from utils.workflow import MysteryFlow, QUERY_REFLECTION_PROMPT, delete_queries, run_workflow
+from benchmarks.common import load_fixture, fixture_llm, percentile
+
+
+FIXTURES = ["game_small", "game_medium", "game_large", "game_malformed"]
+
+SAMPLE_TRACEBACK = """Traceback (most recent call last):
+  File "utils/workflow.py", line 205, in validate_sql
+    query_dict = json.loads(query_str)
+json.decoder.JSONDecodeError: Expecting value: line 1 column 1 (char 0)
+"""
+
+
+def timed(fn, repeat: int, warmup: int = 1, setup=None) -> dict:
+    """
+    Time `fn` `repeat` times after `warmup` untimed runs. `setup` runs untimed before every call.
+    """
+    timings = []
+    for i in range(warmup + repeat):
+        if setup:
+            setup()
+        # the pipeline prints a lot, keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+        if i >= warmup:
+            timings.append(elapsed)
+
+    return {
+        "runs": repeat,
+        "min_ms": round(min(timings) * 1000, 3),
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(percentile(timings, 95) * 1000, 3),
+    }
+
+
+def parse_output(output: str):
+    try:
+        return json.loads(clean_string(output))
+    except json.JSONDecodeError:
+        return None
+
+
+def bench_validation(fixture: dict, repeat: int) -> dict:
+    # validate the queries of malformed outputs too, not only the JSON error
+    output = parse_output(fixture["output"]) or parse_output(clean_string(fixture["output"]).replace("```", ""))
+    queries = [q["query"] for q in output["queries"]]
+
+    return {
+        "parse": timed(lambda: parse_output(fixture["output"]), repeat),
+        "is_valid_sql": timed(lambda: [is_valid_sql(q) for q in queries], repeat),
+        "is_non_destructive": timed(lambda: [is_non_destructive(q) for q in queries], repeat),
+        "reflection_prompt": timed(lambda: build_reflection_prompt(
+            QUERY_REFLECTION_PROMPT, wrong_output=fixture["output"], error=SAMPLE_TRACEBACK,
+            dbml_schema=MysteryFlow.dbml_schema), repeat),
+    }
+
+
+def drop_schema(schema_name: str):
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS `{schema_name}`;")
+
+
+def bench_database(fixture: dict, repeat: int) -> dict:
+    schema_name = f"bench_{uuid.uuid4().hex[:8]}"
+    results = {}
+
+    try:
+        results["create_schema_and_tables"] = timed(lambda: create_schema_and_tables(schema_name), repeat,
+                                                    setup=lambda: drop_schema(schema_name))
+
+        output = parse_output(fixture["output"]) or json.loads(fixture["corrections"][-1])
+        queries = [q["query"] for q in output["queries"]]
+        reset = lambda: run_queries_in_schema(schema_name=schema_name, query_list=delete_queries)
+        results["run_queries_in_schema"] = timed(lambda: run_queries_in_schema(schema_name, queries), repeat,
+                                                 setup=reset)
+
+        def run_flow():
+            result = asyncio.run(run_workflow(schema_name=schema_name, llm=fixture_llm(fixture), verbose=False))
+            if not isinstance(result, dict):
+                raise RuntimeError(f"Workflow failed: {result}")
+
+        results["flow_end_to_end"] = timed(run_flow, repeat, setup=reset)
+    finally:
+        drop_schema(schema_name)
+
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list:
+    regressions = []
+    print(f"\nComparison against {baseline['meta']['commit']} (threshold {threshold}x):")
+    for key, stats in current["results"].items():
+        base = baseline["results"].get(key)
+        if not base:
+            continue
+        ratio = stats["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        # sub-millisecond stages are too noisy to flag on the ratio alone
+        slower = stats["median_ms"] - base["median_ms"] > min_delta_ms
+        flag = "REGRESSION" if ratio > threshold and slower else ""
+        print(f"  {key:<45} {base['median_ms']:>10.3f} -> {stats['median_ms']:>10.3f} ms  x{ratio:.2f} {flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", nargs="+", default=FIXTURES)
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs for validation stages")
+    parser.add_argument("--db-repeat", type=int, default=5, help="timed runs for database stages")
+    parser.add_argument("--db", action="store_true", help="also run database and end-to-end stages")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                        help="ignore slowdowns smaller than this many milliseconds")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.fixtures:
+        fixture = load_fixture(name)
+        stages = bench_validation(fixture, args.repeat)
+        if args.db:
+            stages.update(bench_database(fixture, args.db_repeat))
+
+        for stage, stats in stages.items():
+            results[f"{name}/{stage}"] = stats
+            print(f"{name + '/' + stage:<45} median {stats['median_ms']:>10.3f} ms  "
+                  f"min {stats['min_ms']:>10.3f} ms  p95 {stats['p95_ms']:>10.3f} ms")
+
+    current = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(current, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if compare(current, baseline, args.threshold, args.min_delta_ms):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Microbenchmark: DictCursor rows -> pd.DataFrame (current path) vs tuple rows -> column-wise DataFrame.
+
+Rows are synthetic and shaped like the Alibis table (INT, nullable INT, VARCHAR, BOOLEAN, DATETIME),
+so no database is needed. Run from the repository root:
+
+    python -m benchmarks.bench_results --rows 10000 100000 1000000
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+import pandas as pd
+from pymysql.constants import FIELD_TYPE
+from utils.results import build_dataframe
+
+
+# (name, type_code, display_size, internal_size, precision, scale, null_ok) as returned by pymysql
+DESCRIPTION = (
+    ("alibi_id", FIELD_TYPE.LONG, None, 11, 11, 0, False),
+    ("suspect_id", FIELD_TYPE.LONG, None, 11, 11, 0, True),
+    ("alibi", FIELD_TYPE.VAR_STRING, None, 1020, 1020, 0, True),
+    ("alibi_verified", FIELD_TYPE.TINY, None, 1, 1, 0, True),
+    ("alibi_time", FIELD_TYPE.DATETIME, None, 19, 19, 0, True),
+)
+
+
+def make_rows(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    start = datetime(2024, 10, 31, 18, 0)
+    alibis = ["At the library", "Walking the dog", "Dinner with family", "Working late at the office"]
+    return [
+        (i, rng.randint(1, 10) if rng.random() > 0.05 else None, rng.choice(alibis),
+         rng.randint(0, 1), start + timedelta(minutes=rng.randint(0, 600)))
+        for i in range(n)
+    ]
+
+
+def dict_path(rows: list) -> pd.DataFrame:
+    # what DictCursor + pd.DataFrame(data, columns=...) do today
+    names = [desc[0] for desc in DESCRIPTION]
+    data = [dict(zip(names, row)) for row in rows]
+    return pd.DataFrame(data, columns=names)
+
+
+def columnar_path(rows: list) -> pd.DataFrame:
+    return build_dataframe(rows, DESCRIPTION)
+
+
+def measure(fn, rows: list, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        df = fn(rows)
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    df = fn(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "best_s": round(min(timings), 4),
+        "peak_mib": round(peak / 2 ** 20, 2),
+        "frame_mib": round(df.memory_usage(deep=True).sum() / 2 ** 20, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for n in args.rows:
+        rows = make_rows(n)
+        for name, fn in (("dict", dict_path), ("columnar", columnar_path)):
+            result = {"rows": n, "path": name, **measure(fn, rows, args.repeat)}
+            results.append(result)
+            print(f"{n:>9} rows  {name:<9} {result['best_s']:>8.4f}s  "
+                  f"peak {result['peak_mib']:>9.2f} MiB  frame {result['frame_mib']:>8.2f} MiB")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
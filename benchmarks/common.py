@@ -0,0 +1,45 @@
+import itertools
+import json
+import math
+import os
+from utils.llm_client import StubLLM
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixture(name: str) -> dict:
+    """
+    Load a recorded game: `story`, raw LLM `output`, optional self-correction `corrections`,
+    `solution` and `hint`.
+    """
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json")) as file:
+        return json.load(file)
+
+
+def fixture_llm(fixture: dict, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                seed: int = None) -> StubLLM:
+    """
+    Stub LLM that answers each workflow / hint prompt with the matching part of a recorded game.
+    Self-correction prompts get the recorded `corrections` in turn, the last one repeating.
+    """
+    recorded = fixture.get("corrections") or [fixture["output"]]
+    corrections = itertools.chain(recorded, itertools.repeat(recorded[-1]))
+
+    def respond(prompt: str) -> str:
+        if "Write an engaging and creative story" in prompt:
+            return fixture["story"]
+        if "You already created this output" in prompt:
+            return next(corrections)
+        if "return valid SQL Insert queries" in prompt:
+            return fixture["output"]
+        return fixture["hint"]
+
+    return StubLLM(responses=respond, latency=latency, jitter=jitter, error_rate=error_rate, seed=seed)
+
+
+def percentile(values: list, pct: float) -> float:
+    # nearest-rank percentile
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
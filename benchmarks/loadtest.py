@@ -0,0 +1,353 @@
+"""
+Concurrent-player load test for the game page logic.
+
+Every simulated session does what a player does in sql_mystery_game.py: provision the temporary
+schema, run MysteryFlow, run a mix of SQL editor queries, request hints, guess the murderer and
+finish the game (leaderboard insert + schema drop). The LLM is a StubLLM replaying a recorded game
+with configurable latency, wrapped in the same ResilientLLM the app uses (one shared instance, like
+utils.workflow.get_llm), and hints go through a HintPrefetcher per session exactly like "Get Hint".
+Player think time and the prefetch delays are scaled down from the page's. The database is a local
+MySQL configured through environment variables:
+
+    AWS_RDS_HOST=127.0.0.1 AWS_RDS_USER=root AWS_RDS_PASSWORD=secret \\
+        python -m benchmarks.loadtest --sessions 1 5 10 25 --llm-latency 1.5
+
+For each concurrency level it reports throughput, p50/p95/p99 latency per operation, the prefetched
+hint hit rate and the peak number of threads, in-flight LLM calls, MySQL connections and tasks queued
+for the ResilientLLM and hint prefetch worker pools (a non-zero queue means the pool is saturated). The first level where an operation's
+p95 grows past `--saturation-factor` times its single-level baseline, or errors appear, is reported
+as the saturation point.
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pymysql.err import ProgrammingError
+from utils import hint_prefetch
+from utils.hint_prefetch import HintPrefetcher
+from utils.llm_client import ResilientLLM
+from utils.state_store import InMemoryStateStore, StateStore
+from utils.prompts import build_hint_prompt, HINT_PROMPT
+from utils.streaming import StreamRenderer
+from utils.telemetry import SessionQueryLog
+from utils.results import fetch_dataframe
+from utils.routing import get_read_connection, get_router
+from utils.solution import matches_solution
+from utils.utils import get_connection, create_schema_and_tables, run_queries_in_schema, generate_username
+from utils.workflow import run_workflow, delete_queries
+from benchmarks.common import load_fixture, fixture_llm, percentile
+
+
+PLAYER_QUERIES = [
+    "SELECT * FROM Victim;",
+    "SELECT * FROM Suspects;",
+    "SELECT * FROM Alibis WHERE alibi_verified = FALSE;",
+    "SELECT s.name, a.alibi, a.alibi_time FROM Suspects s JOIN Alibis a ON s.suspect_id = a.suspect_id;",
+    "SELECT * FROM CrimeScene WHERE evidence_found = TRUE;",
+    "SELECT e.description, s.name FROM Evidence e JOIN Suspects s ON e.points_to_suspect_id = s.suspect_id;",
+    "SELECT points_to_suspect_id, COUNT(*) AS cnt FROM Evidence GROUP BY points_to_suspect_id ORDER BY cnt DESC;",
+]
+
+
+class CountingLLM:
+    """Wraps an LLM to track the number of in-flight calls."""
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _track(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def complete(self, prompt: str, **kwargs):
+        with self._track():
+            return self.llm.complete(prompt, **kwargs)
+
+    def stream_complete(self, prompt: str, **kwargs):
+        with self._track():
+            yield from self.llm.stream_complete(prompt, **kwargs)
+
+
+class Recorder:
+    """Thread-safe latency and error bookkeeping per operation."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.counts = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def count(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    @contextmanager
+    def time(self, op: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            with self._lock:
+                self.errors[op] += 1
+            raise
+        else:
+            with self._lock:
+                self.latencies[op].append(time.perf_counter() - start)
+
+
+class ResourceMonitor(threading.Thread):
+    """Samples thread count, MySQL connections and LLM worker pool queues while a level is running."""
+
+    def __init__(self, llm: ResilientLLM, interval: float = 0.25):
+        super().__init__(daemon=True)
+        self.llm = llm
+        self.interval = interval
+        self.peak_threads = 0
+        self.peak_db_connections = 0
+        self.peak_llm_queue = 0
+        self.peak_prefetch_queue = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        conn = get_connection()
+        try:
+            while not self._stop_event.is_set():
+                self.peak_threads = max(self.peak_threads, threading.active_count())
+                # tasks waiting for a worker of the app's two LLM thread pools
+                self.peak_llm_queue = max(self.peak_llm_queue, self.llm._executor._work_queue.qsize())
+                self.peak_prefetch_queue = max(self.peak_prefetch_queue,
+                                               hint_prefetch._executor._work_queue.qsize())
+                with conn.cursor() as cursor:
+                    cursor.execute("SHOW GLOBAL STATUS LIKE 'Threads_connected';")
+                    self.peak_db_connections = max(self.peak_db_connections, int(cursor.fetchone()["Value"]))
+                self._stop_event.wait(self.interval)
+        finally:
+            conn.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def play_session(session_id: int, run_id: str, llm, store: StateStore, recorder: Recorder, args, solution: str):
+    rng = random.Random(session_id)
+    schema_name = f"loadtest_{run_id}_{session_id}"
+    hints = []
+    query_log = SessionQueryLog(session=schema_name)
+    prefetcher = HintPrefetcher(llm_factory=lambda: llm, template=HINT_PROMPT,
+                                idle_delay=args.prefetch_idle_delay, min_interval=args.prefetch_min_interval,
+                                store=store)
+
+    try:
+        with recorder.time("provision"):
+            try:
+                create_schema_and_tables(schema_name=schema_name)
+            except ProgrammingError:
+                run_queries_in_schema(schema_name=schema_name, query_list=delete_queries)
+
+        with recorder.time("workflow"):
+            result = asyncio.run(run_workflow(schema_name=schema_name, llm=llm, verbose=False))
+            if not isinstance(result, dict):
+                raise RuntimeError(f"Workflow failed: {result}")
+        get_router().pin_primary(schema_name)
+        # every real game has its own story, the fixture replays one for all sessions and levels;
+        # tag it so hint fingerprints (and the hint cache) never match across sessions
+        story = f"[{run_id}-{session_id}] {result['story']}"
+
+        # the page starts prefetching the first hint right after the story
+        prefetcher.schedule(story=story, queries=query_log.queries(), hints=hints)
+
+        for _ in range(args.queries):
+            time.sleep(rng.uniform(0, 2 * args.think_time))
+            sql_query = rng.choice(PLAYER_QUERIES)
+            with recorder.time("query"):
+                # same path as sql_editor: read connection, columnar DataFrame, telemetry record
+                with get_read_connection(database=schema_name, session_key=schema_name) as conn:
+                    start = time.perf_counter()
+                    df = fetch_dataframe(conn, sql_query)
+                    query_log.record(sql_query, duration=time.perf_counter() - start, rows=len(df))
+            prefetcher.schedule(story=story, queries=query_log.queries(), hints=hints)
+
+            if rng.random() < args.hint_rate:
+                # the player reads the result before asking, which is when the prefetch runs
+                time.sleep(rng.uniform(0, 2 * args.think_time))
+                with recorder.time("hint"):
+                    # same path as show_hint: prefetched hint if ready, otherwise stream a fresh one
+                    hint = prefetcher.get(story=story, queries=query_log.queries(), hints=hints)
+                    if hint is not None:
+                        recorder.count("hint_prefetched")
+                    else:
+                        recorder.count("hint_live")
+                        prefetcher.cancel()
+                        prompt = build_hint_prompt(HINT_PROMPT, story=story, queries=query_log.queries(), hints=hints)
+                        hint = StreamRenderer(None).render_stream(llm.stream_complete(prompt))
+                        prefetcher.put(story=story, queries=query_log.queries(), hints=hints, hint=hint)
+                hints.append(hint)
+                prefetcher.schedule(story=story, queries=query_log.queries(), hints=hints)
+
+        with recorder.time("guess"):
+            if not matches_solution(solution.upper(), result["solution_hash"]):
+                raise RuntimeError("Unexpected solution")
+
+        with recorder.time("end_game"):
+            with get_connection(database=args.leaderboard_schema) as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("INSERT INTO leaderboard (username, date, time_sec) VALUES (%s, CURDATE(), %s);",
+                                   (generate_username(), rng.randint(60, 900)))
+            drop_schema(schema_name)
+
+    except Exception as e:
+        print(f"Session {session_id} failed: {e!r}")
+        drop_schema(schema_name)
+
+    finally:
+        prefetcher.cancel()
+
+
+def drop_schema(schema_name: str):
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS `{schema_name}`;")
+
+
+def setup_leaderboard(schema_name: str):
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE SCHEMA IF NOT EXISTS `{schema_name}`;")
+            cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS `{schema_name}`.leaderboard (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                username VARCHAR(100),
+                date DATE,
+                time_sec INT
+            );
+            """)
+
+
+def run_level(sessions: int, args, fixture: dict) -> dict:
+    run_id = uuid.uuid4().hex[:8]
+    provider = CountingLLM(fixture_llm(fixture, args.llm_latency, args.llm_jitter, args.llm_error_rate))
+    # one instance shared by all sessions, like utils.workflow.get_llm in the app
+    llm = ResilientLLM(primary=provider, max_workers=args.llm_workers)
+    # fresh hint cache per level, hints cached by an earlier level must not count as prefetched
+    store = InMemoryStateStore()
+    recorder = Recorder()
+    monitor = ResourceMonitor(llm)
+    monitor.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        for session_id in range(sessions):
+            executor.submit(play_session, session_id, run_id, llm, store, recorder, args, fixture["solution"])
+    wall = time.perf_counter() - start
+    monitor.stop()
+
+    ops = {}
+    for op, values in recorder.latencies.items():
+        ops[op] = {
+            "count": len(values),
+            "errors": recorder.errors.get(op, 0),
+            "p50_ms": round(percentile(values, 50) * 1000, 1),
+            "p95_ms": round(percentile(values, 95) * 1000, 1),
+            "p99_ms": round(percentile(values, 99) * 1000, 1),
+        }
+    for op, count in recorder.errors.items():
+        ops.setdefault(op, {"count": 0, "errors": count})
+
+    return {
+        "sessions": sessions,
+        "wall_s": round(wall, 2),
+        "sessions_per_s": round(len(recorder.latencies.get("end_game", [])) / wall, 3),
+        "ops_per_s": round(sum(len(v) for v in recorder.latencies.values()) / wall, 2),
+        "peak_threads": monitor.peak_threads,
+        "peak_llm_in_flight": provider.peak,
+        "peak_llm_queue": monitor.peak_llm_queue,
+        "peak_prefetch_queue": monitor.peak_prefetch_queue,
+        "hints_prefetched": recorder.counts.get("hint_prefetched", 0),
+        "hints_live": recorder.counts.get("hint_live", 0),
+        "peak_db_connections": monitor.peak_db_connections,
+        "operations": ops,
+    }
+
+
+def find_saturation(levels: list, factor: float) -> dict:
+    """
+    For each operation, the first concurrency level whose p95 exceeds `factor` x the baseline p95
+    or that produced errors.
+    """
+    baseline = levels[0]["operations"]
+    saturation = {}
+    for level in levels:
+        for op, stats in level["operations"].items():
+            if op in saturation:
+                continue
+            base_p95 = baseline.get(op, {}).get("p95_ms")
+            slow = base_p95 and stats.get("p95_ms", 0) > factor * base_p95
+            if stats.get("errors") or slow:
+                saturation[op] = level["sessions"]
+    return saturation
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 25])
+    parser.add_argument("--queries", type=int, default=10, help="SQL editor queries per session")
+    parser.add_argument("--hint-rate", type=float, default=0.3, help="probability of a hint after a query")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="stub LLM latency per call in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.5)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-workers", type=int, default=8, help="ResilientLLM worker threads, 8 in the app")
+    parser.add_argument("--think-time", type=float, default=1.0, help="mean player pause between queries in seconds")
+    parser.add_argument("--prefetch-idle-delay", type=float, default=0.5, help="HintPrefetcher idle_delay (3s on the page)")
+    parser.add_argument("--prefetch-min-interval", type=float, default=2.0,
+                        help="HintPrefetcher min_interval (15s on the page)")
+    parser.add_argument("--fixture", default="game_small")
+    parser.add_argument("--leaderboard-schema", default="loadtest_leaderboard",
+                        help="schema for leaderboard inserts, keep it away from the real leaderboard")
+    parser.add_argument("--saturation-factor", type=float, default=2.0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    fixture = load_fixture(args.fixture)
+    setup_leaderboard(args.leaderboard_schema)
+
+    levels = []
+    for sessions in args.sessions:
+        level = run_level(sessions, args, fixture)
+        levels.append(level)
+
+        print(f"\n{sessions} concurrent sessions: {level['wall_s']}s, {level['sessions_per_s']} sessions/s, "
+              f"{level['ops_per_s']} ops/s, peak threads {level['peak_threads']}, "
+              f"peak LLM in flight {level['peak_llm_in_flight']}, peak DB connections {level['peak_db_connections']}, "
+              f"peak queued LLM/prefetch tasks {level['peak_llm_queue']}/{level['peak_prefetch_queue']}, "
+              f"hints prefetched {level['hints_prefetched']}/{level['hints_prefetched'] + level['hints_live']}")
+        for op, stats in level["operations"].items():
+            print(f"  {op:<10} n={stats['count']:<5} err={stats['errors']:<3} "
+                  f"p50={stats.get('p50_ms', '-')}ms p95={stats.get('p95_ms', '-')}ms p99={stats.get('p99_ms', '-')}ms")
+
+    saturation = find_saturation(levels, args.saturation_factor)
+    print("\nSaturation points (sessions):", saturation or "none reached")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"levels": levels, "saturation": saturation}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
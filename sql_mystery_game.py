@@ -1,15 +1,24 @@
 import streamlit as st
 import pymysql
 from streamlit_ace import st_ace
-from utils.utils import get_connection, is_valid_query, initiate_llm, create_schema_and_tables, generate_username, run_queries_in_schema
-import pandas as pd
-from utils.workflow import run_workflow
+from utils.utils import get_connection, is_valid_query, create_schema_and_tables, generate_username, run_queries_in_schema
+from utils.results import fetch_dataframe
+from utils.routing import get_read_connection, get_router
+from utils.workflow import run_workflow, get_llm
+from utils.prompts import build_hint_prompt, HINT_PROMPT
+from utils.hint_prefetch import HintPrefetcher
+from utils.telemetry import SessionQueryLog
+from utils.streaming import StreamRenderer
+from utils.solution import hash_solution, matches_solution
+from utils.leaderboard import record_result
+from utils.games import pop_game, ingest_game
 import asyncio
 import time
 from datetime import datetime
 import streamlit.components.v1 as components
 from pymysql.err import ProgrammingError
 import re
+import uuid
 
 
 @st.fragment
@@ -19,11 +28,12 @@ def show_hint(hint_prompt):
 
         Args:
             hint_prompt (str): A template string for the LLM input with placeholders for
-                `story`, `queries`, and `hints` from the session state.
+                `story`, `queries`, and `hints` from the session state. The prompt is built
+                within a token budget from the latest unique queries and hints.
 
         Session State:
             - `ai_story` (str): The AI-generated story.
-            - `user_queries` (list): User-submitted queries.
+            - `query_log` (SessionQueryLog): Ring buffer of executed user queries.
             - `ai_hints` (list): Previously generated hints.
 
         Returns:
@@ -32,34 +42,67 @@ def show_hint(hint_prompt):
     hint_button = st.button('Get Hint 🪄')
 
     if hint_button and st.session_state.ai_story is not None:
-        with st.spinner("Thinking..."):
-            llm = initiate_llm()
-            response = llm.stream_complete(hint_prompt.format(story=st.session_state.ai_story,
-                                                             queries=st.session_state.user_queries,
-                                                             hints=st.session_state.ai_hints))
-        # Stream
-        placeholder = st.empty()
-        full_hint = ""
-        for chunk in response:
-            full_hint += chunk.delta
-            placeholder.markdown(full_hint)
+        prefetcher = st.session_state.hint_prefetcher
+
+        # serve the background hint if it was computed for the current query history
+        full_hint = prefetcher.get(story=st.session_state.ai_story,
+                                   queries=st.session_state.query_log.queries(),
+                                   hints=st.session_state.ai_hints)
+        if full_hint is not None:
+            st.markdown(full_hint)
+        else:
+            prefetcher.cancel()
+            with st.spinner("Thinking..."):
+                llm = get_llm()
+                prompt = build_hint_prompt(hint_prompt, story=st.session_state.ai_story,
+                                           queries=st.session_state.query_log.queries(),
+                                           hints=st.session_state.ai_hints)
+                response = llm.stream_complete(prompt)
+            # Stream
+            renderer = StreamRenderer(st.empty())
+            full_hint = renderer.render_stream(response)
+            print('hint stream', renderer.stats())
+            prefetcher.put(story=st.session_state.ai_story, queries=st.session_state.query_log.queries(),
+                           hints=st.session_state.ai_hints, hint=full_hint)
 
         # add to session state
         st.session_state['ai_hints'].append(full_hint)
 
+        # prepare the follow-up hint
+        prefetch_hint()
+
+
+def prefetch_hint():
+    """
+        Schedules background generation of the next hint for the current game state.
+
+        Session State:
+            - `hint_prefetcher` (HintPrefetcher): The per-session prefetcher.
+            - `ai_story` (str): The AI-generated story.
+            - `query_log` (SessionQueryLog): Ring buffer of executed user queries.
+            - `ai_hints` (list): Previously generated hints.
+
+        Returns:
+            None
+    """
+    st.session_state.hint_prefetcher.schedule(story=st.session_state.ai_story,
+                                              queries=st.session_state.query_log.queries(),
+                                              hints=st.session_state.ai_hints)
+
 
 @st.fragment
 def check_solution():
     """
         Checks the user's solution to the mystery against the correct answer.
 
-        Prompts the user to input their guess for the murderer's name, compares it to the correct solution
-        retrieved from the database, and updates the session state accordingly.
+        Prompts the user to input their guess for the murderer's name, compares it to the hash of the
+        correct solution captured when the game was ingested, and updates the session state accordingly.
 
         Session State:
             - `ai_story` (str): The AI-generated story (must not be None to proceed).
             - `user_solutions` (list): A list of guesses submitted by the user.
             - `current_user` (str): The current user's database schema for querying.
+            - `solution_hash` (str): Hash of the normalized murderer name.
             - `start_time` (float): The start time of the game.
             - `end_time` (float): The end time of the game, set if the solution is correct.
             - `elapsed_time` (float): The total time taken to solve the mystery, calculated on success.
@@ -80,15 +123,17 @@ def check_solution():
         # add to session state
         st.session_state.user_solutions.append(user_solution)
 
-        # get correct solution
-        with get_connection(autocommit=True, database=st.session_state.current_user) as conn:
-            with conn.cursor() as cursor:
-                cursor.execute("SELECT name from Murderer;")
-                data = cursor.fetchall()
-                solution = data[0]['name']
-
-        # compare correct solution with user solution
-        if user_solution.strip() == solution.strip():
+        # the solution hash is captured at ingestion, only look it up if the game predates that
+        if st.session_state.solution_hash is None:
+            with get_read_connection(database=st.session_state.current_user,
+                                     session_key=st.session_state.current_user) as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT name from Murderer;")
+                    data = cursor.fetchall()
+                    st.session_state.solution_hash = hash_solution(data[0]['name'])
+
+        # compare correct solution with user solution, ignoring case, accents and name order
+        if matches_solution(user_solution, st.session_state.solution_hash):
             # record end time
             st.session_state.end_time = time.time()
             st.session_state.elapsed_time = st.session_state.end_time - st.session_state.start_time
@@ -141,20 +186,25 @@ def sql_editor():
         if not is_valid_query(sql_query):
             st.error("Wrong query syntax or non-Select statement. Please provide a valid SQL query.")
         else:
+            start = None
             try:
-                with get_connection(autocommit=True, database=st.session_state.current_user) as conn:
-                    with conn.cursor() as cursor:
-                        cursor.execute(sql_query)
-                        data = cursor.fetchall()
-
-                        column_names = [desc[0] for desc in cursor.description]
-                        df = pd.DataFrame(data, columns=column_names)
-
-                        # display the result as df
-                        st.dataframe(df, hide_index=True, use_container_width=True)
+                with get_read_connection(database=st.session_state.current_user,
+                                         session_key=st.session_state.current_user) as conn:
+                    # time the query only, not the connect and auth to RDS
+                    start = time.perf_counter()
+                    df = fetch_dataframe(conn, sql_query)
+                    st.session_state.query_log.record(sql_query, duration=time.perf_counter() - start,
+                                                      rows=len(df))
+
+                    # display the result as df
+                    st.dataframe(df, hide_index=True, use_container_width=True)
             except pymysql.Error as e:
+                duration = time.perf_counter() - start if start is not None else 0.0
+                st.session_state.query_log.record(sql_query, duration=duration, error=e)
                 st.error(e)
 
+            prefetch_hint()
+
 
 @st.dialog("Woo hoo!")
 def end_game():
@@ -203,7 +253,7 @@ def add_to_leaderboard():
         Adds the user's game result to the leaderboard.
 
         Generates a random username and records the current date and the total elapsed time in the
-        `Leaderboard` table of the database.
+        `Leaderboard` table of the database and in the shared leaderboard.
 
         Session State:
             - `elapsed_time` (float): The total time taken by the user to complete the game (in seconds).
@@ -226,6 +276,9 @@ def add_to_leaderboard():
         with conn.cursor() as cursor:
             cursor.execute(query, values)
 
+    # keep the shared leaderboard of all replicas in step with the database
+    record_result(*values)
+
 
 def drop_temp_schema():
     """
@@ -271,27 +324,6 @@ def get_current_user():
         st.session_state.current_user = user_token
 
 
-HINT_PROMPT = """
-You're an assistant helping a user with SQL murder mystery game.
-Your goal is to provide a useful hint to a user and point them in the right direction towards identifying the correct murderer in the game.
-Use your knowledge of dbml game schema.
-Do not reveal the murderer.
-Keep the hint short.
-
-In your hint, reference the game story:
----------------------
-{story}
----------------------
-Here are the user's SQL queries so far:
----------------------
-{queries}
----------------------
-Here are your previous hints:
----------------------
-{hints}
----------------------
-"""
-
 # for resetting temp db
 delete_queries = [
     "DELETE FROM Evidence;",
@@ -303,8 +335,8 @@ delete_queries = [
 ]
 
 # initiate session state dicts
-if "user_queries" not in st.session_state:
-    st.session_state.user_queries = []
+if "query_log" not in st.session_state:
+    st.session_state.query_log = SessionQueryLog(session=str(uuid.uuid4()))
 if "ai_hints" not in st.session_state:
     st.session_state.ai_hints = []
 if "ai_story" not in st.session_state:
@@ -319,6 +351,10 @@ if "elapsed_time" not in st.session_state:
     st.session_state.elapsed_time = None
 if "current_user" not in st.session_state:
     st.session_state.current_user = None
+if "solution_hash" not in st.session_state:
+    st.session_state.solution_hash = None
+if "hint_prefetcher" not in st.session_state:
+    st.session_state.hint_prefetcher = HintPrefetcher(llm_factory=get_llm, template=HINT_PROMPT)
 
 
 st.title("SQL Murder Mystery Game 🕵️‍♂️")
@@ -342,14 +378,28 @@ with col1:
                           query_list=delete_queries)
 
         
-        # run the workflow
+        # use a pre-generated game if one is available, otherwise run the workflow
         try:
-            result = asyncio.run(run_workflow())
+            game = pop_game()
+            if game is not None:
+                ingest_game(st.session_state.current_user, game)
+                st.markdown(game['story'])
+                result = game
+            else:
+                result = asyncio.run(run_workflow(schema_name=st.session_state.current_user))
             
             # add to session state
             st.session_state.ai_story = result['story']
+            st.session_state.solution_hash = result['solution_hash']
             st.session_state.start_time = time.time()
 
+            # read the freshly ingested game from the primary until replicas catch up
+            get_router().pin_primary(st.session_state.current_user)
+
+            # start working on the first hint while the player reads the story
+            st.session_state.hint_prefetcher.cancel()
+            prefetch_hint()
+
         except Exception as e:
             st.error("Oops...something went wrong. Please try again!")
             # for debugging
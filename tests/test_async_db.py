@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+import utils.async_db as async_db
+
+
+class FakePool:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+
+def fake_create_pool(monkeypatch, fail: bool = False):
+    created = []
+
+    async def create_pool(**kwargs):
+        await asyncio.sleep(0.01)
+        if fail:
+            raise ConnectionError("database unreachable")
+        created.append(FakePool())
+        return created[-1]
+
+    monkeypatch.setattr(async_db.aiomysql, "create_pool", create_pool)
+    return created
+
+
+def test_concurrent_first_callers_share_one_pool(monkeypatch):
+    created = fake_create_pool(monkeypatch)
+
+    async def run():
+        pools = await asyncio.gather(*(async_db.get_pool() for _ in range(10)))
+        await async_db.close_pool()
+        return pools
+
+    pools = asyncio.run(run())
+    assert len(created) == 1
+    assert all(pool is created[0] for pool in pools)
+    assert created[0].closed
+
+
+def test_failed_creation_is_retried(monkeypatch):
+    fake_create_pool(monkeypatch, fail=True)
+
+    async def run():
+        with pytest.raises(ConnectionError):
+            await async_db.get_pool()
+        created = fake_create_pool(monkeypatch)
+        pool = await async_db.get_pool()
+        await async_db.close_pool()
+        return pool, created
+
+    pool, created = asyncio.run(run())
+    assert pool is created[0]
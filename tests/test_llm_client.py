@@ -0,0 +1,136 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from utils.llm_client import (
+    ResilientLLM,
+    CircuitBreaker,
+    CircuitOpenError,
+    LLMTimeoutError,
+    StubLLM,
+    ThrottlingError,
+    is_throttling_error,
+)
+
+
+def flaky_responses(failures: int, error=ThrottlingError, text: str = "ok"):
+    """Responses for StubLLM that raise `error` for the first `failures` calls."""
+    calls = {"count": 0}
+
+    def respond(prompt):
+        calls["count"] += 1
+        if calls["count"] <= failures:
+            raise error("ThrottlingException: Too many requests")
+        return text
+
+    return respond, calls
+
+
+def fast_llm(primary, **kwargs):
+    kwargs.setdefault("base_delay", 0.01)
+    kwargs.setdefault("max_delay", 0.02)
+    return ResilientLLM(primary, **kwargs)
+
+
+def test_throttling_is_retried_with_backoff():
+    respond, calls = flaky_responses(failures=2)
+    llm = fast_llm(StubLLM(responses=respond))
+
+    assert llm.complete("prompt").text == "ok"
+    assert calls["count"] == 3
+
+
+def test_retries_stop_after_max_retries():
+    llm = fast_llm(StubLLM(throttle_rate=1.0), max_retries=2)
+
+    with pytest.raises(ThrottlingError):
+        llm.complete("prompt")
+    assert llm.primary.calls == 3
+
+
+def test_non_retryable_error_is_not_retried():
+    llm = fast_llm(StubLLM(error_rate=1.0))
+
+    with pytest.raises(RuntimeError):
+        llm.complete("prompt")
+    assert llm.primary.calls == 1
+
+
+def test_overall_deadline_covers_all_attempts():
+    llm = fast_llm(StubLLM(latency=2.0), call_timeout=0.2, timeout=0.5, max_retries=10)
+
+    start = time.monotonic()
+    with pytest.raises(LLMTimeoutError):
+        llm.complete("prompt")
+    assert time.monotonic() - start < 0.8
+
+
+def test_queued_calls_do_not_time_out():
+    # more callers than workers: waiting for a worker must not count against call_timeout
+    llm = fast_llm(StubLLM(latency=0.2), call_timeout=0.35, timeout=5.0, max_workers=2)
+
+    with ThreadPoolExecutor(max_workers=8) as callers:
+        results = list(callers.map(lambda _: llm.complete("prompt").text, range(8)))
+
+    assert results == ["This is a stub response."] * 8
+
+
+def test_slow_primary_is_hedged_to_secondary():
+    llm = fast_llm(StubLLM(responses=["primary"], latency=1.0),
+                   secondary=StubLLM(responses=["secondary"]), hedge_after=0.05)
+
+    start = time.monotonic()
+    assert llm.complete("prompt").text == "secondary"
+    assert time.monotonic() - start < 0.5
+
+
+def test_hedged_stream_returns_full_text():
+    llm = fast_llm(StubLLM(responses=["primary"], latency=1.0),
+                   secondary=StubLLM(responses=["a streamed answer"], chunk_size=3), hedge_after=0.05)
+
+    assert "".join(chunk.delta for chunk in llm.stream_complete("prompt")) == "a streamed answer"
+
+
+def test_breaker_opens_routes_to_fallback_and_closes_again():
+    primary = StubLLM(error_rate=1.0)
+    fallback = StubLLM(responses=["fallback"])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+    llm = fast_llm(primary, fallback=fallback, breaker=breaker)
+
+    assert llm.complete("prompt").text == "fallback"
+    assert breaker.state == "closed"
+    assert llm.complete("prompt").text == "fallback"
+    assert breaker.state == "open"
+
+    # open: the primary is not called at all
+    assert llm.complete("prompt").text == "fallback"
+    assert primary.calls == 2
+
+    # half-open after reset_timeout, a successful probe closes the breaker
+    time.sleep(0.25)
+    assert breaker.state == "half-open"
+    primary.error_rate = 0.0
+    assert llm.complete("prompt").text == "This is a stub response."
+    assert breaker.state == "closed"
+
+
+def test_open_breaker_without_fallback_raises():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    llm = fast_llm(StubLLM(error_rate=1.0), breaker=breaker)
+
+    with pytest.raises(RuntimeError):
+        llm.complete("prompt")
+    with pytest.raises(CircuitOpenError):
+        llm.complete("prompt")
+
+
+def test_is_throttling_error_handles_missing_response():
+    class HttpError(Exception):
+        response = None
+
+    assert not is_throttling_error(HttpError("boom"))
+    assert is_throttling_error(ThrottlingError("slow down"))
+
+    class ClientError(Exception):
+        response = {"Error": {"Code": "ThrottlingException"}}
+
+    assert is_throttling_error(ClientError("rate exceeded"))
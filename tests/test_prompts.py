@@ -0,0 +1,21 @@
+from utils.prompts import build_reflection_prompt, MIN_ERROR_TOKENS
+
+
+TEMPLATE = "{wrong_answer}\n{error}\n{dbml_schema}"
+
+
+def test_reflection_prompt_keeps_whole_payload():
+    payload = {"queries": [{"query": f"INSERT INTO Suspects VALUES ({i}, 'Suspect {i}');"} for i in range(3000)]}
+    prompt = build_reflection_prompt(TEMPLATE, wrong_output=payload, error="ValueError: bad row",
+                                     dbml_schema="Table Suspects", token_budget=1000)
+
+    assert "Suspect 2999" in prompt
+    assert "ValueError: bad row" in prompt
+
+
+def test_reflection_prompt_trims_error_keeping_the_end():
+    error = "ValueError: " + "x" * 10000 + " failing statement"
+    prompt = build_reflection_prompt(TEMPLATE, wrong_output="{}", error=error, dbml_schema="", token_budget=500)
+
+    assert prompt.rstrip().endswith("failing statement")
+    assert len(prompt) < (500 + MIN_ERROR_TOKENS) * 4
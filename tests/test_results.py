@@ -0,0 +1,29 @@
+from pymysql.constants import FIELD_TYPE
+from utils.results import build_dataframe
+
+
+def description(*columns):
+    return [(name, type_code, None, length, length, 0, True) for name, type_code, length in columns]
+
+
+def test_bigint_unsigned_beyond_int64():
+    df = build_dataframe([(2 ** 64 - 1, 1), (5, None)],
+                         description(("big", FIELD_TYPE.LONGLONG, 20), ("nullable", FIELD_TYPE.LONGLONG, 20)))
+
+    assert df["big"].dtype == "uint64"
+    assert df["big"].iloc[0] == 2 ** 64 - 1
+    assert df["nullable"].dtype == "Int64"
+
+
+def test_out_of_range_mixed_sign_integers_fall_back_to_object():
+    df = build_dataframe([(2 ** 64 - 1,), (-1,)], description(("value", FIELD_TYPE.LONGLONG, 20)))
+
+    assert df["value"].dtype == object
+    assert list(df["value"]) == [2 ** 64 - 1, -1]
+
+
+def test_boolean_and_nullable_int_columns():
+    df = build_dataframe([(1, 3), (0, None)], description(("flag", FIELD_TYPE.TINY, 1), ("count", FIELD_TYPE.LONG, 11)))
+
+    assert df["flag"].dtype == bool
+    assert df["count"].dtype == "Int64"
@@ -0,0 +1,77 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import utils.routing as routing
+from utils.routing import ReplicaRouter
+
+
+def fake_lags(monkeypatch, lags: dict, delay: float = 0.0):
+    calls = []
+
+    def replica_lag(host, connect_timeout=1.0):
+        calls.append(host)
+        time.sleep(delay)
+        return lags.get(host)
+
+    monkeypatch.setattr(routing, "replica_lag", replica_lag)
+    return calls
+
+
+def test_reads_go_to_the_least_lagging_healthy_replica(monkeypatch):
+    fake_lags(monkeypatch, {"replica-1": 3.0, "replica-2": 0.5, "replica-3": None})
+    router = ReplicaRouter("primary", ["replica-1", "replica-2", "replica-3"], max_lag=5)
+
+    hosts = {router.read_host() for _ in range(50)}
+    assert "replica-3" not in hosts
+    assert "replica-2" in hosts
+
+
+def test_replica_turning_unhealthy_during_selection(monkeypatch):
+    fake_lags(monkeypatch, {"replica-1": 1.0, "replica-2": 2.0})
+    router = ReplicaRouter("primary", ["replica-1", "replica-2"], health_ttl=60)
+    router.read_host()
+
+    stop = threading.Event()
+
+    def flap():
+        while not stop.is_set():
+            router.mark_unhealthy("replica-1")
+            with router._lock:
+                router._lag["replica-1"] = (time.monotonic(), 1.0)
+
+    flapper = threading.Thread(target=flap)
+    flapper.start()
+    try:
+        for _ in range(2000):
+            assert router.read_host() in ("primary", "replica-1", "replica-2")
+    finally:
+        stop.set()
+        flapper.join()
+
+
+def test_unreachable_replica_is_probed_once_at_a_time_and_backed_off(monkeypatch):
+    calls = fake_lags(monkeypatch, {}, delay=0.2)
+    router = ReplicaRouter("primary", ["replica-1"], health_ttl=0.05, max_backoff=10)
+
+    # concurrent requests do not all wait for the same probe
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        hosts = list(executor.map(lambda _: router.read_host(), range(8)))
+    assert hosts == ["primary"] * 8
+    assert len(calls) == 1
+
+    # failed probes are retried after growing pauses, not every health_ttl
+    time.sleep(0.15)
+    router.read_host()
+    router.read_host()
+    assert len(calls) == 2
+    assert router._failures["replica-1"] == 2
+
+
+def test_pinned_sessions_read_from_primary(monkeypatch):
+    calls = fake_lags(monkeypatch, {"replica-1": 0.0})
+    router = ReplicaRouter("primary", ["replica-1"])
+
+    router.pin_primary("player", seconds=60)
+    assert router.read_host("player") == "primary"
+    assert router.read_host("someone-else") == "replica-1"
+    assert calls == ["replica-1"]
@@ -0,0 +1,60 @@
+import time
+from utils.hint_prefetch import HintPrefetcher
+from utils.llm_client import StubLLM
+from utils.state_store import InMemoryStateStore
+
+
+def test_push_pop_is_fifo():
+    store = InMemoryStateStore()
+    store.push("games", {"id": 1})
+    store.push("games", {"id": 2})
+
+    assert store.length("games") == 2
+    assert [store.pop("games"), store.pop("games"), store.pop("games")] == [{"id": 1}, {"id": 2}, None]
+
+
+def test_values_expire():
+    store = InMemoryStateStore()
+    store.set("key", "value", ttl=0.05)
+
+    assert store.get("key") == "value"
+    time.sleep(0.1)
+    assert store.get("key") is None
+
+
+def test_ranked_set_keeps_lowest_scores():
+    store = InMemoryStateStore()
+    for name, score in [("a", 5), ("b", 3), ("c", 9), ("d", 1)]:
+        store.add_ranked("board", {"name": name}, score, max_size=3)
+
+    assert store.top_ranked("board", 10) == [{"name": "d"}, {"name": "b"}, {"name": "a"}]
+
+
+def test_replace_ranked_keeps_members_added_after_the_snapshot():
+    store = InMemoryStateStore()
+    store.add_ranked("board", {"name": "removed"}, 1)
+    snapshot = store.top_ranked("board", 10)
+    # recorded while the replacement was being read from the database
+    store.add_ranked("board", {"name": "new"}, 4)
+
+    store.replace_ranked("board", [({"name": "db"}, 2)], max_size=10, snapshot=snapshot)
+
+    assert store.top_ranked("board", 10) == [{"name": "db"}, {"name": "new"}]
+
+
+def test_prefetched_hints_are_shared_through_the_store():
+    store = InMemoryStateStore()
+    llm = StubLLM(responses=["look at the alibis"])
+    first = HintPrefetcher(lambda: llm, "{story} {queries} {hints}", idle_delay=0, min_interval=0, store=store)
+    second = HintPrefetcher(lambda: llm, "{story} {queries} {hints}", idle_delay=0, min_interval=0, store=store)
+
+    first.schedule("story", ["SELECT * FROM Suspects;"], [])
+    deadline = time.monotonic() + 2
+    while first.get("story", ["SELECT * FROM Suspects;"], []) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # another session (or replica) in the same game state gets the hint without a new LLM call
+    assert second.get("story", ["SELECT * FROM Suspects;"], []) == "look at the alibis"
+    second.schedule("story", ["SELECT * FROM Suspects;"], [])
+    time.sleep(0.1)
+    assert llm.calls == 1
@@ -0,0 +1,99 @@
+import asyncio
+import weakref
+import aiomysql
+import pandas as pd
+from pymysql.constants import CLIENT
+from utils.results import build_dataframe
+from utils.utils import get_secret, split_host
+
+
+# one pool per event loop, aiomysql connections cannot be shared between loops. The value is the
+# task creating the pool, stored before it is awaited so concurrent first callers share one pool.
+_pools = weakref.WeakKeyDictionary()
+
+
+async def _create_pool(maxsize: int = None) -> aiomysql.Pool:
+    host, port = split_host(get_secret("aws_rds_host"), int(get_secret("aws_rds_port", 3306)))
+    return await aiomysql.create_pool(
+        host=host,
+        port=port,
+        user=get_secret("aws_rds_user", "admin"),
+        password=get_secret("aws_rds_password"),
+        autocommit=True,
+        minsize=1,
+        maxsize=maxsize or int(get_secret("db_pool_size", 10)),
+        client_flag=CLIENT.MULTI_STATEMENTS,
+    )
+
+
+async def get_pool(maxsize: int = None) -> aiomysql.Pool:
+    """
+    Function that returns the connection pool of the running event loop, creating it on first use.
+    :param maxsize: maximum number of connections, defaults to the `db_pool_size` secret or 10
+    :return: aiomysql pool
+    """
+    loop = asyncio.get_running_loop()
+    task = _pools.get(loop)
+
+    if task is None:
+        # no await between the lookup and the store, so only the first caller creates the pool
+        task = loop.create_task(_create_pool(maxsize))
+        _pools[loop] = task
+
+    try:
+        # shielded, a cancelled caller must not cancel the creation the others are waiting for
+        return await asyncio.shield(task)
+    except Exception:
+        # let the next call retry instead of failing forever on a cached error
+        if _pools.get(loop) is task:
+            del _pools[loop]
+        raise
+
+
+async def close_pool():
+    """
+    Function to close the connection pool of the running event loop.
+    """
+    task = _pools.pop(asyncio.get_running_loop(), None)
+    if task is None:
+        return
+
+    try:
+        pool = await task
+    except Exception:
+        return
+    pool.close()
+    await pool.wait_closed()
+
+
+async def run_queries_in_schema_async(schema_name: str, query_list: list):
+    """
+    Async version of run_queries_in_schema using the pooled connections.
+    :param schema_name: Name of the schema to use
+    :param query_list: List of SQL queries to execute
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        # pooled connections keep the schema of their previous user, always select it
+        await conn.select_db(schema_name)
+        async with conn.cursor() as cursor:
+            for query in query_list:
+                await cursor.execute(query)
+
+
+async def fetch_dataframe_async(query: str, database: str = None, args=None) -> pd.DataFrame:
+    """
+    Async version of fetch_dataframe using the pooled connections.
+    :param query: SQL query to execute
+    :param database: schema to use
+    :param args: optional query parameters
+    :return: pd.DataFrame
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        if database:
+            await conn.select_db(database)
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, args)
+            rows = await cursor.fetchall()
+            return build_dataframe(rows, cursor.description)
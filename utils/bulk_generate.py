@@ -0,0 +1,239 @@
+"""
+Offline bulk generation of games.
+
+Runs MysteryFlow `--games` times across a pool of `--workers` processes. Every run gets its own scratch
+schema, the generated data is validated there and the schema is dropped again. Games that pass are
+appended to a JSON lines archive and, with `--push`, added to the shared game inventory that
+"Generate Story" takes games from (set `state_store_url`, the in-memory store dies with this process).
+LLM calls across all workers are limited to `--llm-concurrency` at a time to stay within Bedrock quotas.
+Run from the repository root with the usual secrets, e.g. outside peak hours:
+
+    python -m utils.bulk_generate --games 50 --workers 8 --llm-concurrency 4 --archive game_archive.jsonl
+
+`--fixture game_small` replays a recorded game from benchmarks/fixtures instead of calling Bedrock.
+Token counts in the summary are estimates (see utils.prompts.estimate_tokens).
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from utils.games import push_game
+from utils.prompts import estimate_tokens
+from utils.utils import get_connection, create_schema_and_tables
+from utils.workflow import run_workflow, get_llm
+
+
+GAME_TABLES = ["Victim", "Suspects", "Alibis", "CrimeScene", "Evidence", "Murderer"]
+
+# set in every worker process by _init_worker
+_llm_slots = None
+_fixture = None
+
+
+class BoundedLLM:
+    """Wraps an LLM to share a limited number of call slots between processes and count tokens."""
+
+    def __init__(self, llm, slots):
+        self.llm = llm
+        self.slots = slots
+        self.completions = 0
+        self.tokens = 0
+        self._lock = threading.Lock()
+
+    def _count(self, prompt: str, text: str):
+        with self._lock:
+            self.tokens += estimate_tokens(prompt) + estimate_tokens(text)
+
+    def complete(self, prompt: str, **kwargs):
+        with self.slots:
+            response = self.llm.complete(prompt, **kwargs)
+        with self._lock:
+            self.completions += 1
+        self._count(prompt, response.text)
+        return response
+
+    def stream_complete(self, prompt: str, **kwargs):
+        # the slot is held until the stream is consumed
+        with self.slots:
+            text = ""
+            for chunk in self.llm.stream_complete(prompt, **kwargs):
+                text = chunk.text
+                yield chunk
+        self._count(prompt, text)
+
+
+def _init_worker(llm_slots, fixture: dict):
+    global _llm_slots, _fixture
+    _llm_slots = llm_slots
+    _fixture = fixture
+
+
+def _make_llm():
+    if _fixture is not None:
+        from benchmarks.common import fixture_llm
+        return fixture_llm(_fixture)
+    return get_llm()
+
+
+def validate_game(schema_name: str):
+    """
+    Function to check the generated data of a game beyond what MysteryFlow already checks.
+    :param schema_name: scratch schema holding the game
+    :raise ValueError: if a table is empty or the murderer is not one of the suspects
+    """
+    with get_connection(database=schema_name) as conn:
+        with conn.cursor() as cursor:
+            for table in GAME_TABLES:
+                cursor.execute(f"SELECT COUNT(*) AS cnt FROM {table};")
+                if cursor.fetchone()["cnt"] == 0:
+                    raise ValueError(f"Table {table} is empty")
+
+            cursor.execute("SELECT COUNT(*) AS cnt FROM Murderer m JOIN Suspects s ON m.suspect_id = s.suspect_id;")
+            if cursor.fetchone()["cnt"] == 0:
+                raise ValueError("Murderer is not one of the suspects")
+
+
+def drop_schema(schema_name: str):
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS `{schema_name}`;")
+
+
+def generate_game(index: int, timeout: float) -> dict:
+    """
+    Function to generate and validate one game in a scratch schema. Runs in a worker process.
+    :param index: number of the game in this run
+    :param timeout: workflow timeout in seconds, including time spent waiting for an LLM slot
+    :return: dict with `ok`, `game`, `error`, `retries`, `tokens` and `seconds`
+    """
+    schema_name = f"bulk_{uuid.uuid4().hex[:12]}"
+    llm = BoundedLLM(_make_llm(), _llm_slots)
+    start = time.perf_counter()
+    game, error = None, None
+
+    try:
+        create_schema_and_tables(schema_name=schema_name)
+        result = asyncio.run(run_workflow(schema_name=schema_name, llm=llm, verbose=False, timeout=timeout))
+        if not isinstance(result, dict):
+            raise RuntimeError(f"Workflow failed: {result}")
+        validate_game(schema_name)
+        game = {"story": result["story"], "queries": result["queries"], "solution_hash": result["solution_hash"]}
+
+    except Exception as e:
+        error = repr(e)
+        print(f"Game {index} failed: {error}")
+
+    finally:
+        try:
+            drop_schema(schema_name)
+        except Exception as e:
+            print(f"Could not drop scratch schema {schema_name}: {e!r}")
+
+    return {
+        "ok": game is not None,
+        "game": game,
+        "error": error,
+        # one completion writes the insert queries, every further one is a self-correction
+        "retries": max(0, llm.completions - 1),
+        "tokens": llm.tokens,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def _generate_game_star(job: tuple) -> dict:
+    return generate_game(*job)
+
+
+def summarize(results: list, wall: float) -> dict:
+    """
+    Function to aggregate the per-game results of a run.
+    :param results: list of dicts returned by generate_game
+    :param wall: wall-clock duration of the run in seconds
+    :return: summary dict
+    """
+    games = len(results)
+    succeeded = [result for result in results if result["ok"]]
+
+    def per_game(field):
+        return round(sum(result[field] for result in results) / games, 2) if games else 0
+
+    return {
+        "games": games,
+        "succeeded": len(succeeded),
+        "success_rate": round(len(succeeded) / games, 3) if games else 0,
+        "retries_per_game": per_game("retries"),
+        "tokens_per_game": per_game("tokens"),
+        "seconds_per_game": per_game("seconds"),
+        # what a catalog costs: everything spent divided by the games we got out of it
+        "tokens_per_success": round(sum(result["tokens"] for result in results) / len(succeeded)) if succeeded else None,
+        "wall_s": round(wall, 2),
+        "games_per_min": round(len(succeeded) / wall * 60, 2) if wall else 0,
+    }
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=positive_int, default=10, help="number of games to generate")
+    parser.add_argument("--workers", type=positive_int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--llm-concurrency", type=positive_int, default=4,
+                        help="LLM calls in flight across all workers")
+    parser.add_argument("--archive", default="game_archive.jsonl", help="JSON lines file the games are appended to")
+    parser.add_argument("--push", action="store_true", help="also add the games to the shared game inventory")
+    parser.add_argument("--timeout", type=float, default=600, help="workflow timeout per game in seconds")
+    parser.add_argument("--fixture", help="replay a recorded game from benchmarks/fixtures instead of Bedrock")
+    parser.add_argument("--json", help="write the summary to this file")
+    args = parser.parse_args()
+
+    fixture = None
+    if args.fixture:
+        from benchmarks.common import load_fixture
+        fixture = load_fixture(args.fixture)
+
+    # spawn, the parent may already hold threads (telemetry writer, llm executors) that fork would copy
+    context = multiprocessing.get_context("spawn")
+    results = []
+    start = time.perf_counter()
+
+    with context.Manager() as manager, open(args.archive, "a") as archive:
+        llm_slots = manager.BoundedSemaphore(args.llm_concurrency)
+
+        with context.Pool(processes=min(args.workers, args.games), initializer=_init_worker,
+                          initargs=(llm_slots, fixture)) as pool:
+            jobs = [(index, args.timeout) for index in range(args.games)]
+
+            for result in pool.imap_unordered(_generate_game_star, jobs):
+                results.append(result)
+                if result["ok"]:
+                    archive.write(json.dumps(result["game"]) + "\n")
+                    archive.flush()
+                    if args.push:
+                        push_game(result["game"])
+                print(f"[{len(results)}/{args.games}] {'ok' if result['ok'] else 'failed'} "
+                      f"in {result['seconds']:.1f}s, {result['retries']} retries, ~{result['tokens']} tokens")
+
+    summary = summarize(results, time.perf_counter() - start)
+
+    print(f"\n{summary['succeeded']}/{summary['games']} games generated "
+          f"(success rate {summary['success_rate']:.0%}) in {summary['wall_s']}s, {summary['games_per_min']} games/min")
+    print(f"Per game: {summary['retries_per_game']} retries, ~{summary['tokens_per_game']} tokens, "
+          f"{summary['seconds_per_game']}s; ~{summary['tokens_per_success']} tokens per successful game")
+    print(f"Archive: {args.archive}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(summary, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
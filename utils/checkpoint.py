@@ -0,0 +1,79 @@
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from utils.state_store import StateStore, get_state_store
+from utils.utils import get_secret
+
+
+@dataclass
+class FlowCheckpoint:
+    story: str = None
+    raw_output: str | dict = None
+    queries: dict = None
+    retries: int = 0
+    updated_at: float = field(default_factory=time.time)
+
+
+class CheckpointStore:
+    """
+    Keeps the progress of a MysteryFlow run per session, so a failed or timed out run can resume
+    at the first incomplete step. Checkpoints live in the shared state store and expire when they
+    are not touched for `ttl` seconds.
+    """
+
+    def __init__(self, store: StateStore = None, ttl: float = 1800.0):
+        self.store = store or get_state_store()
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(key: str) -> str:
+        return f"checkpoint:{key}"
+
+    def load(self, key: str):
+        """
+        Get the checkpoint of a session.
+        :param key: session identifier, e.g. the user's schema name
+        :return: FlowCheckpoint or None
+        """
+        data = self.store.get(self._key(key))
+        return FlowCheckpoint(**data) if data else None
+
+    def save(self, key: str, checkpoint: FlowCheckpoint):
+        """
+        Store the checkpoint of a session.
+        :param key: session identifier
+        :param checkpoint: FlowCheckpoint
+        """
+        checkpoint.updated_at = time.time()
+        self.store.set(self._key(key), asdict(checkpoint), ttl=self.ttl)
+
+    def update(self, key: str, **fields) -> FlowCheckpoint:
+        """
+        Update some fields of a session's checkpoint, creating it if needed.
+        :param key: session identifier
+        :return: FlowCheckpoint
+        """
+        checkpoint = self.load(key) or FlowCheckpoint()
+        for name, value in fields.items():
+            setattr(checkpoint, name, value)
+        self.save(key, checkpoint)
+        return checkpoint
+
+    def clear(self, key: str):
+        self.store.delete(self._key(key))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    """
+    Function that returns the process-wide checkpoint store.
+    :return: CheckpointStore
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CheckpointStore(ttl=float(get_secret("checkpoint_ttl", 1800)))
+        return _store
@@ -0,0 +1,31 @@
+from utils.state_store import StateStore, get_state_store, GAME_INVENTORY_KEY
+from utils.utils import run_queries_in_schema
+
+
+def push_game(game: dict, store: StateStore = None):
+    """
+    Function to add a pre-generated game to the shared inventory.
+    :param game: dict with `story`, `queries` ({"queries": [{"query": ...}]}) and `solution_hash`
+    :param store: state store, defaults to the process-wide one
+    """
+    (store or get_state_store()).push(GAME_INVENTORY_KEY, game)
+
+
+def pop_game(store: StateStore = None):
+    """
+    Function to take a pre-generated game from the shared inventory. Every game is handed out once,
+    also when several replicas pop at the same time.
+    :param store: state store, defaults to the process-wide one
+    :return: game dict or None if the inventory is empty
+    """
+    return (store or get_state_store()).pop(GAME_INVENTORY_KEY)
+
+
+def ingest_game(schema_name: str, game: dict):
+    """
+    Function to load a pre-generated game into a player's schema.
+    :param schema_name: player's schema with empty game tables
+    :param game: game dict as returned by pop_game
+    """
+    run_queries_in_schema(schema_name=schema_name,
+                          query_list=[query['query'] for query in game['queries']['queries']])
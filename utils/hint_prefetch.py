@@ -0,0 +1,153 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.prompts import build_hint_prompt, compact_history
+from utils.state_store import StateStore, get_state_store, HINT_CACHE_KEY
+
+
+# shared by all sessions so background hint generation stays bounded per app instance
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hint-prefetch")
+
+
+def history_fingerprint(story: str, queries: list, hints: list) -> str:
+    """
+    Fingerprint the game state a hint is generated for.
+    Queries come normalized from SessionQueryLog, so formatting-only differences keep the same
+    fingerprint; they are only deduplicated here, this runs on every query and hint click.
+    :param story: game story
+    :param queries: normalized player queries (SessionQueryLog.queries()), oldest first
+    :param hints: previous hints, oldest first
+    :return: hex digest
+    """
+    digest = hashlib.sha256()
+    for part in [story or ""] + compact_history(queries) + list(hints):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class HintPrefetcher:
+    """
+    Computes the next hint in the background so that "Get Hint" can be served instantly.
+
+    `schedule` is called after every player query. The prefetch starts once the player has been
+    idle for `idle_delay` seconds and no sooner than `min_interval` seconds after the previous one.
+    A newer schedule cancels the pending or running prefetch. Background threads never touch
+    `st.session_state`, finished hints go to the shared state store under the game state
+    fingerprint for `cache_ttl` seconds, where any session and replica in the same state finds them
+    (e.g. players of the same pre-generated game asking for a first hint).
+    `llm_factory` should return the process-wide LLM (utils.workflow.get_llm), so prefetches share
+    its circuit breaker and worker pool with every other LLM call.
+    """
+
+    def __init__(self, llm_factory, template: str, idle_delay: float = 3.0, min_interval: float = 15.0,
+                 store: StateStore = None, cache_ttl: float = 600.0):
+        self.llm_factory = llm_factory
+        self.template = template
+        self.idle_delay = idle_delay
+        self.min_interval = min_interval
+        self.store = store or get_state_store()
+        self.cache_ttl = cache_ttl
+        self._lock = threading.Lock()
+        self._timer = None
+        self._cancel_event = None
+        self._pending_fingerprint = None
+        self._last_started = 0.0
+
+    @staticmethod
+    def _key(fingerprint: str) -> str:
+        return f"{HINT_CACHE_KEY}:{fingerprint}"
+
+    def schedule(self, story: str, queries: list, hints: list):
+        """
+        Schedule a prefetch for the given game state, replacing any pending one.
+        :param story: game story
+        :param queries: player queries, oldest first
+        :param hints: previous hints, oldest first
+        """
+        if not story:
+            return
+
+        fingerprint = history_fingerprint(story, queries, hints)
+        # checked outside the lock, the store may be a network round trip away
+        if self.store.get(self._key(fingerprint)) is not None:
+            return
+
+        with self._lock:
+            if fingerprint == self._pending_fingerprint:
+                return
+
+            self._cancel_locked()
+
+            delay = max(self.idle_delay, self._last_started + self.min_interval - time.monotonic())
+            cancel_event = threading.Event()
+            self._cancel_event = cancel_event
+            self._pending_fingerprint = fingerprint
+            self._timer = threading.Timer(delay, _executor.submit,
+                                          args=(self._prefetch, fingerprint, cancel_event,
+                                                story, list(queries), list(hints)))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def get(self, story: str, queries: list, hints: list):
+        """
+        Return the cached hint for the given game state, if there is one.
+        :param story: game story
+        :param queries: player queries, oldest first
+        :param hints: previous hints, oldest first
+        :return: hint string or None
+        """
+        return self.store.get(self._key(history_fingerprint(story, queries, hints)))
+
+    def put(self, story: str, queries: list, hints: list, hint: str):
+        """
+        Cache a hint generated for the given game state, e.g. one streamed while no prefetch was ready.
+        :param story: game story
+        :param queries: player queries, oldest first
+        :param hints: previous hints, oldest first
+        :param hint: hint text
+        """
+        self.store.set(self._key(history_fingerprint(story, queries, hints)), hint, ttl=self.cache_ttl)
+
+    def cancel(self):
+        """Cancel the pending or running prefetch."""
+        with self._lock:
+            self._cancel_locked()
+
+    def _cancel_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+        self._timer = None
+        self._cancel_event = None
+        self._pending_fingerprint = None
+
+    def _prefetch(self, fingerprint: str, cancel_event: threading.Event, story: str, queries: list, hints: list):
+        if cancel_event.is_set():
+            return
+
+        with self._lock:
+            self._last_started = time.monotonic()
+
+        prompt = build_hint_prompt(self.template, story=story, queries=queries, hints=hints)
+
+        try:
+            # stream so that a cancelled prefetch stops consuming tokens early
+            chunks = []
+            for chunk in self.llm_factory().stream_complete(prompt):
+                if cancel_event.is_set():
+                    return
+                chunks.append(chunk.delta)
+        except Exception as e:
+            print(f"Hint prefetch failed: {e}")
+            return
+
+        with self._lock:
+            if cancel_event.is_set():
+                return
+            self._pending_fingerprint = None
+
+        # older game states expire from the store after cache_ttl
+        self.store.set(self._key(fingerprint), "".join(chunks), ttl=self.cache_ttl)
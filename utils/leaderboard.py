@@ -0,0 +1,50 @@
+import pandas as pd
+from utils.results import fetch_dataframe
+from utils.routing import get_read_connection
+from utils.state_store import StateStore, get_state_store, LEADERBOARD_KEY
+
+
+# number of best results kept in the shared store
+LEADERBOARD_SIZE = 100
+# the database stays the source of truth, the shared copy is rebuilt from it this often
+LEADERBOARD_RESYNC_SECONDS = 3600
+
+LEADERBOARD_QUERY = f"SELECT username, date, time_sec FROM leaderboard ORDER BY time_sec ASC LIMIT {LEADERBOARD_SIZE};"
+
+
+def record_result(username: str, date: str, time_sec: int, store: StateStore = None):
+    """
+    Function to add a game result to the shared leaderboard.
+    :param username: player name shown on the leaderboard
+    :param date: date of the game, YYYY-MM-DD
+    :param time_sec: time to solve the game in seconds
+    :param store: state store, defaults to the process-wide one
+    """
+    store = store or get_state_store()
+    store.add_ranked(LEADERBOARD_KEY, {"username": username, "date": date, "time_sec": time_sec},
+                     score=time_sec, max_size=LEADERBOARD_SIZE)
+
+
+def top_results(n: int = 10, store: StateStore = None) -> pd.DataFrame:
+    """
+    Function to get the best results from the shared leaderboard, loading it from the database
+    when the shared copy is missing or due for a resync.
+    :param n: number of results
+    :param store: state store, defaults to the process-wide one
+    :return: pd.DataFrame with username, date and time_sec columns
+    """
+    store = store or get_state_store()
+
+    if store.get(f"{LEADERBOARD_KEY}:synced") is None:
+        # results recorded after this snapshot may be missing from the database read, they are kept
+        snapshot = store.top_ranked(LEADERBOARD_KEY, LEADERBOARD_SIZE)
+        with get_read_connection(database="original_game_schema") as conn:
+            df = fetch_dataframe(conn, LEADERBOARD_QUERY)
+
+        items = [({"username": row.username, "date": str(row.date), "time_sec": int(row.time_sec)}, int(row.time_sec))
+                 for row in df.itertuples(index=False)]
+        # swapped in at once, other replicas never see an empty or partial board
+        store.replace_ranked(LEADERBOARD_KEY, items, max_size=LEADERBOARD_SIZE, snapshot=snapshot)
+        store.set(f"{LEADERBOARD_KEY}:synced", True, ttl=LEADERBOARD_RESYNC_SECONDS)
+
+    return pd.DataFrame(store.top_ranked(LEADERBOARD_KEY, n), columns=["username", "date", "time_sec"])
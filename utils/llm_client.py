@@ -0,0 +1,298 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from llama_index.core.llms import CompletionResponse
+
+
+class ThrottlingError(Exception):
+    """Raised by the stub LLM to mimic a Bedrock ThrottlingException."""
+
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when an LLM call does not answer before its deadline."""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when the circuit breaker is open and no fallback is configured."""
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """
+    Check if an exception means the provider is throttling us.
+    :param error: exception raised by the LLM client
+    :return: boolean
+    """
+    if isinstance(error, ThrottlingError):
+        return True
+
+    # botocore ClientError keeps the AWS error code in .response
+    # requests/httpx exceptions have a .response that can be None
+    code = (getattr(error, "response", None) or {}).get("Error", {}).get("Code", "")
+    if code in ("ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"):
+        return True
+
+    return "throttl" in str(error).lower()
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Check if an LLM call that failed with this exception is worth retrying.
+    :param error: exception raised by the LLM client
+    :return: boolean
+    """
+    return is_throttling_error(error) or isinstance(error, (TimeoutError, ConnectionError))
+
+
+class CircuitBreaker:
+    """
+    Minimal circuit breaker: opens after `failure_threshold` consecutive failures and lets
+    probe requests through again once `reset_timeout` seconds have passed.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class _Call:
+    """An LLM request submitted to the executor, remembering when it actually started running."""
+
+    def __init__(self, executor: ThreadPoolExecutor, fn, llm):
+        self.started = threading.Event()
+        self.started_at = None
+        self.future = executor.submit(self._run, fn, llm)
+
+    def _run(self, fn, llm):
+        self.started_at = time.monotonic()
+        self.started.set()
+        return fn(llm)
+
+    def deadline(self, call_timeout: float, overall_deadline: float) -> float:
+        # time spent queued for a worker only counts against the overall deadline
+        if self.started_at is None:
+            return overall_deadline
+        return min(self.started_at + call_timeout, overall_deadline)
+
+
+class ResilientLLM:
+    """
+    Wrapper around a llama-index LLM that adds jittered exponential backoff on throttling,
+    per-attempt and overall deadlines, optional hedged requests to a secondary LLM and a circuit
+    breaker that routes traffic to a fallback LLM.
+
+    Every call finishes within `timeout` seconds, including all retries, backoff sleeps and the
+    fallback. A single attempt may run for at most `call_timeout` seconds, counted from the moment
+    a worker picks it up rather than from when it was queued.
+
+    Exposes `complete` and `stream_complete` so it can be used wherever the Bedrock object was.
+    """
+
+    def __init__(self, primary, secondary=None, fallback=None, max_retries: int = 4,
+                 base_delay: float = 0.5, max_delay: float = 8.0, call_timeout: float = 40.0,
+                 timeout: float = 50.0, hedge_after: float = None, breaker: CircuitBreaker = None,
+                 max_workers: int = 8):
+        self.primary = primary
+        self.secondary = secondary
+        self.fallback = fallback
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.call_timeout = call_timeout
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+
+    def complete(self, prompt: str, **kwargs) -> CompletionResponse:
+        return self._execute(lambda llm: llm.complete(prompt, **kwargs))
+
+    def stream_complete(self, prompt: str, **kwargs):
+        # the deadline and hedging apply to the first chunk, the rest is streamed as it comes
+        first_chunk, stream = self._execute(lambda llm: _prime_stream(llm.stream_complete(prompt, **kwargs)))
+        return _chain_stream(first_chunk, stream)
+
+    def _execute(self, fn):
+        deadline = time.monotonic() + self.timeout
+
+        if not self.breaker.allow_request():
+            return self._call_fallback(fn, CircuitOpenError("Circuit breaker is open"), deadline)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = self._hedged_call(fn, deadline)
+                self.breaker.record_success()
+                return result
+
+            except Exception as e:
+                self.breaker.record_failure()
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+                # no retry once the next attempt could not start before the overall deadline
+                if (not is_retryable_error(e) or attempt == self.max_retries
+                        or time.monotonic() + delay >= deadline):
+                    return self._call_fallback(fn, e, deadline)
+
+                print(f"LLM call failed ({e!r}), retrying in {delay:.2f}s...")
+                time.sleep(delay)
+
+    def _hedged_call(self, fn, deadline: float):
+        calls = [_Call(self._executor, fn, self.primary)]
+
+        if self.secondary is not None and self.hedge_after is not None:
+            # hedge once the primary has been running (not queued) for hedge_after seconds
+            primary = calls[0]
+            primary.started.wait(timeout=max(0.0, deadline - time.monotonic()))
+            done, _ = wait([primary.future], timeout=max(0.0, min(self.hedge_after, deadline - time.monotonic())))
+            if not done and time.monotonic() < deadline:
+                calls.append(_Call(self._executor, fn, self.secondary))
+
+        return self._first_result(calls, deadline)
+
+    def _first_result(self, calls: list, deadline: float):
+        # first successful answer wins; an error only counts once every request has failed
+        pending = set(calls)
+        error = None
+        timed_out = False
+
+        while pending:
+            now = time.monotonic()
+            expired = {call for call in pending if call.deadline(self.call_timeout, deadline) <= now}
+            for call in expired:
+                call.future.cancel()
+            pending -= expired
+            timed_out = timed_out or bool(expired)
+            if not pending:
+                break
+
+            remaining = min(call.deadline(self.call_timeout, deadline) for call in pending) - now
+            done, _ = wait([call.future for call in pending], timeout=remaining, return_when=FIRST_COMPLETED)
+
+            for call in [call for call in pending if call.future in done]:
+                pending.discard(call)
+                if call.future.exception() is None:
+                    for other in pending:
+                        other.future.cancel()
+                    return call.future.result()
+                error = call.future.exception()
+
+        if error is not None and not timed_out:
+            raise error
+        raise LLMTimeoutError(f"LLM did not respond within its deadline ({self.call_timeout}s per attempt, "
+                              f"{self.timeout}s overall)")
+
+    def _call_fallback(self, fn, error: Exception, deadline: float):
+        if self.fallback is None or time.monotonic() >= deadline:
+            raise error
+
+        print(f"Primary LLM unavailable ({error!r}), using fallback model")
+        return self._first_result([_Call(self._executor, fn, self.fallback)], deadline)
+
+
+def _prime_stream(stream):
+    """Pull the first chunk so that a hung stream is caught by the call deadline."""
+    iterator = iter(stream)
+    first_chunk = next(iterator, None)
+    return first_chunk, iterator
+
+
+def _chain_stream(first_chunk, stream):
+    if first_chunk is not None:
+        yield first_chunk
+    yield from stream
+
+
+async def astream_in_thread(make_stream):
+    """
+    Iterate a blocking LLM stream from async code without blocking the event loop.
+    :param make_stream: function that starts the stream, e.g. lambda: llm.stream_complete(prompt)
+    :return: async generator of chunks
+    """
+    stream = await asyncio.to_thread(lambda: iter(make_stream()))
+    done = object()
+    while True:
+        chunk = await asyncio.to_thread(next, stream, done)
+        if chunk is done:
+            return
+        yield chunk
+
+
+class StubLLM:
+    """
+    Local stand-in for the Bedrock model. Returns canned responses and can inject latency,
+    throttling and generic errors so the resilience logic can be exercised without AWS.
+    `responses` is either a list of texts returned in turn or a function mapping a prompt to a text.
+    """
+
+    def __init__(self, responses=None, latency: float = 0.0, jitter: float = 0.0,
+                 throttle_rate: float = 0.0, error_rate: float = 0.0, chunk_size: int = 20,
+                 seed: int = None):
+        self.responses = responses or ["This is a stub response."]
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _next_response(self, prompt: str) -> str:
+        with self._lock:
+            if callable(self.responses):
+                text = self.responses(prompt)
+            else:
+                text = self.responses[self.calls % len(self.responses)]
+            self.calls += 1
+            roll = self._random.random()
+            delay = self.latency + self._random.uniform(0, self.jitter)
+
+        time.sleep(delay)
+
+        if roll < self.throttle_rate:
+            raise ThrottlingError("ThrottlingException: Too many requests")
+        if roll < self.throttle_rate + self.error_rate:
+            raise RuntimeError("Stub LLM error")
+
+        return text
+
+    def complete(self, prompt: str, **kwargs) -> CompletionResponse:
+        return CompletionResponse(text=self._next_response(prompt))
+
+    def stream_complete(self, prompt: str, **kwargs):
+        text = self._next_response(prompt)
+
+        def gen():
+            full = ""
+            for i in range(0, len(text), self.chunk_size):
+                delta = text[i:i + self.chunk_size]
+                full += delta
+                yield CompletionResponse(text=full, delta=delta)
+
+        return gen()
@@ -0,0 +1,198 @@
+import json
+from sqlglot import transpile, errors
+
+
+# Rough size limits for the prompts we send on every hint / self-correction
+HINT_TOKEN_BUDGET = 3000
+STORY_TOKEN_BUDGET = 1500
+REFLECTION_TOKEN_BUDGET = 6000
+MAX_HISTORY_ITEMS = 10
+# part of the error message kept in a reflection prompt however large the payload is
+MIN_ERROR_TOKENS = 200
+
+HINT_PROMPT = """
+You're an assistant helping a user with SQL murder mystery game.
+Your goal is to provide a useful hint to a user and point them in the right direction towards identifying the correct murderer in the game.
+Use your knowledge of dbml game schema.
+Do not reveal the murderer.
+Keep the hint short.
+
+In your hint, reference the game story:
+---------------------
+{story}
+---------------------
+Here are the user's SQL queries so far:
+---------------------
+{queries}
+---------------------
+Here are your previous hints:
+---------------------
+{hints}
+---------------------
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English text and SQL).
+    :param text:
+    :return: estimated number of tokens
+    """
+    return len(text) // 4 + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int, keep: str = "head") -> str:
+    """
+    Truncate text so that it fits into the given token budget.
+    :param text:
+    :param max_tokens: token budget
+    :param keep: "head" to keep the beginning of the text, "tail" to keep the end
+    :return: truncated text
+    """
+    max_chars = max(max_tokens, 0) * 4
+    if len(text) <= max_chars:
+        return text
+
+    if keep == "tail":
+        return "..." + text[len(text) - max_chars:]
+    return text[:max_chars] + "..."
+
+
+def normalize_query(sql_query: str) -> str:
+    """
+    Normalize a SQL query with sqlglot so that formatting differences collapse to one string.
+    :param sql_query:
+    :return: normalized single-line query
+    """
+    try:
+        return transpile(sql_query, read="mysql", write="mysql")[0]
+    except (errors.SqlglotError, IndexError):
+        return " ".join(sql_query.split())
+
+
+def compact_history(items: list, max_items: int = MAX_HISTORY_ITEMS, normalize=None) -> list:
+    """
+    Deduplicate a history list and keep only the most recent entries.
+    When an entry repeats, only its latest occurrence is kept.
+    :param items: history, oldest first
+    :param max_items: maximum number of entries to keep
+    :param normalize: optional function applied to each entry before deduplication
+    :return: compacted history, oldest first
+    """
+    seen = set()
+    compacted = []
+
+    for item in reversed(items):
+        item = normalize(item) if normalize else str(item).strip()
+        if not item or item in seen:
+            continue
+        seen.add(item)
+        compacted.append(item)
+        if len(compacted) >= max_items:
+            break
+
+    return list(reversed(compacted))
+
+
+def fit_history(items: list, token_budget: int) -> list:
+    """
+    Keep the newest entries of a history that fit into the token budget.
+    :param items: history, oldest first
+    :param token_budget:
+    :return: history that fits the budget, oldest first
+    """
+    kept = []
+    used = 0
+
+    for item in reversed(items):
+        cost = estimate_tokens(item)
+        if used + cost > token_budget:
+            break
+        kept.append(item)
+        used += cost
+
+    return list(reversed(kept))
+
+
+def format_history(items: list) -> str:
+    """
+    Format a history list as numbered lines instead of a Python list repr.
+    :param items:
+    :return: formatted string
+    """
+    if not items:
+        return "None"
+    return "\n".join(f"{i}. {item}" for i, item in enumerate(items, start=1))
+
+
+def trim_traceback(error: str) -> str:
+    """
+    Reduce a formatted traceback to the final exception line(s).
+    :param error: traceback or error message
+    :return: error message
+    """
+    lines = [line for line in str(error).strip().splitlines() if line.strip()]
+    if not lines:
+        return ""
+
+    # the exception itself is the last block not indented like a stack frame
+    message = []
+    for line in reversed(lines):
+        if line.startswith((" ", "\t")) or line.startswith("Traceback"):
+            break
+        message.append(line)
+
+    return "\n".join(reversed(message)) or lines[-1]
+
+
+def build_hint_prompt(template: str, story: str, queries: list, hints: list,
+                      token_budget: int = HINT_TOKEN_BUDGET) -> str:
+    """
+    Build the hint prompt within a token budget.
+    The story is capped, and the remaining budget is shared between the newest unique
+    queries and hints, so the prompt size stays flat over a long session.
+    :param template: prompt with `story`, `queries` and `hints` placeholders
+    :param story: game story
+    :param queries: normalized player queries (SessionQueryLog.queries()), oldest first
+    :param hints: previous hints, oldest first
+    :param token_budget: total budget for the prompt
+    :return: prompt string
+    """
+    story = truncate_to_tokens(story or "", STORY_TOKEN_BUDGET)
+    remaining = token_budget - estimate_tokens(template) - estimate_tokens(story)
+
+    # already normalized at record time, transpiling the whole ring buffer again would be slow
+    queries = compact_history(queries)
+    hints = compact_history(hints, max_items=MAX_HISTORY_ITEMS // 2)
+
+    # queries are the main signal for the next hint, give them the larger share
+    queries = fit_history(queries, max(remaining * 2 // 3, 0))
+    hints = fit_history(hints, max(remaining - sum(estimate_tokens(q) for q in queries), 0))
+
+    return template.format(story=story, queries=format_history(queries), hints=format_history(hints))
+
+
+def build_reflection_prompt(template: str, wrong_output, error: str, dbml_schema: str,
+                            token_budget: int = REFLECTION_TOKEN_BUDGET) -> str:
+    """
+    Build the self-correction prompt with a trimmed error and a compact copy of the wrong payload.
+    The payload is never cut: the model has to return all of it corrected, so a truncated copy would
+    make it drop or invent game data. Only the error is trimmed to the budget left after the
+    template, schema and payload, and a large payload can therefore exceed `token_budget`.
+    :param template: prompt with `wrong_answer`, `error` and `dbml_schema` placeholders
+    :param wrong_output: previous LLM output, string or dict
+    :param error: traceback or error message
+    :param dbml_schema: game schema
+    :param token_budget: total budget for the prompt
+    :return: prompt string
+    """
+    if isinstance(wrong_output, dict):
+        wrong_output = json.dumps(wrong_output, separators=(",", ":"))
+    else:
+        wrong_output = " ".join(str(wrong_output).split())
+
+    remaining = token_budget - estimate_tokens(template) - estimate_tokens(dbml_schema) - estimate_tokens(wrong_output)
+    # the end of the message names the failing statement, keep it even when the payload is large
+    error = truncate_to_tokens(trim_traceback(error), max(remaining, MIN_ERROR_TOKENS), keep="tail")
+
+    return template.format(wrong_answer=wrong_output, error=error, dbml_schema=dbml_schema)
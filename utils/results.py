@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+from pymysql.constants import FIELD_TYPE
+from pymysql.cursors import Cursor
+
+
+INT_TYPES = {FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.INT24, FIELD_TYPE.LONG, FIELD_TYPE.LONGLONG,
+             FIELD_TYPE.YEAR}
+FLOAT_TYPES = {FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE}
+# DATE columns are kept as datetime.date objects so they display without a time part
+DATETIME_TYPES = {FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP}
+
+
+def _is_boolean(type_code: int, length, values: tuple) -> bool:
+    # MySQL stores BOOLEAN as TINYINT(1)
+    return (type_code == FIELD_TYPE.TINY and length == 1
+            and all(value in (0, 1) for value in values if value is not None))
+
+
+def _int_array(values: tuple, has_nulls: bool):
+    try:
+        return pd.array(values, dtype="Int64") if has_nulls else np.array(values, dtype=np.int64)
+    except OverflowError:
+        pass
+
+    # BIGINT UNSIGNED past the int64 range, e.g. `SELECT ~0;`; the description has no UNSIGNED flag
+    if all(value >= 0 for value in values if value is not None):
+        try:
+            return pd.array(values, dtype="UInt64") if has_nulls else np.array(values, dtype=np.uint64)
+        except OverflowError:
+            pass
+    return np.array(values, dtype=object)
+
+
+def column_to_array(values: tuple, type_code: int, length=None):
+    """
+    Convert the values of one result column to an array with a proper dtype.
+    Nullable pandas dtypes are used for INT and BOOLEAN columns that contain NULLs.
+    :param values: column values as returned by pymysql
+    :param type_code: pymysql FIELD_TYPE of the column
+    :param length: column length from the cursor description
+    :return: numpy or pandas array
+    """
+    has_nulls = any(value is None for value in values)
+
+    if _is_boolean(type_code, length, values):
+        if has_nulls:
+            return pd.array([None if value is None else bool(value) for value in values], dtype="boolean")
+        return np.array(values, dtype=bool)
+
+    if type_code in INT_TYPES:
+        return _int_array(values, has_nulls)
+
+    if type_code in FLOAT_TYPES:
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+    if type_code in DATETIME_TYPES:
+        return pd.to_datetime(pd.Series(values, dtype=object), errors="coerce").array
+
+    return np.array(values, dtype=object)
+
+
+def build_dataframe(rows, description) -> pd.DataFrame:
+    """
+    Build a DataFrame column-wise from tuple rows and a DB-API cursor description.
+    :param rows: sequence of row tuples
+    :param description: cursor.description
+    :return: pd.DataFrame
+    """
+    if description is None:
+        return pd.DataFrame()
+
+    column_names = [desc[0] for desc in description]
+
+    if not rows:
+        return pd.DataFrame(columns=column_names)
+
+    # positional keys keep duplicate column names (e.g. joined `name` columns) apart
+    columns = {
+        i: column_to_array(values, desc[1], desc[3])
+        for i, (values, desc) in enumerate(zip(zip(*rows), description))
+    }
+    df = pd.DataFrame(columns, copy=False)
+    df.columns = column_names
+    return df
+
+
+def fetch_dataframe(conn, query: str, args=None) -> pd.DataFrame:
+    """
+    Execute a query and materialize the result as a DataFrame without building a dict per row.
+    :param conn: pymysql connection
+    :param query: SQL query to execute
+    :param args: optional query parameters
+    :return: pd.DataFrame
+    """
+    with conn.cursor(Cursor) as cursor:
+        cursor.execute(query, args)
+        rows = cursor.fetchall()
+        return build_dataframe(rows, cursor.description)
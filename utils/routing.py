@@ -0,0 +1,180 @@
+import random
+import threading
+import time
+import pymysql
+from pymysql import Connection
+from utils.utils import get_connection, get_secret
+
+
+class ReplicaRouter:
+    """
+    Chooses the host for read-only work.
+
+    Replica lag is checked with SHOW REPLICA STATUS and cached for `health_ttl` seconds. Replicas that
+    cannot be reached, have broken replication or lag more than `max_lag` seconds are skipped; among
+    the rest two are sampled and the one with less lag is used. Sessions pinned with `pin_primary`
+    read from the primary until the pin expires, so players see the game data they just ingested.
+
+    Health checks run on the request that finds the cached lag stale, with a `probe_timeout` connect
+    timeout and one check per replica at a time; other requests keep using the cached result meanwhile.
+    A replica that keeps failing is re-checked after exponentially longer pauses, up to `max_backoff`.
+    """
+
+    def __init__(self, primary_host: str, replica_hosts: list, max_lag: float = 5.0,
+                 health_ttl: float = 5.0, pin_seconds: float = 30.0, probe_timeout: float = 1.0,
+                 max_backoff: float = 60.0):
+        self.primary_host = primary_host
+        self.replica_hosts = replica_hosts
+        self.max_lag = max_lag
+        self.health_ttl = health_ttl
+        self.pin_seconds = pin_seconds
+        self.probe_timeout = probe_timeout
+        self.max_backoff = max_backoff
+        self._lag = {}
+        self._failures = {}
+        self._probing = set()
+        self._pins = {}
+        self._lock = threading.Lock()
+
+    def pin_primary(self, session_key: str, seconds: float = None):
+        """
+        Route reads of a session to the primary for a while (read-your-writes after ingestion).
+        :param session_key: session identifier, e.g. the user's schema name
+        :param seconds: pin duration, defaults to `pin_seconds`
+        """
+        with self._lock:
+            self._pins[session_key] = time.monotonic() + (seconds or self.pin_seconds)
+
+    def is_pinned(self, session_key: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            # drop expired pins while we are here
+            self._pins = {key: expiry for key, expiry in self._pins.items() if expiry > now}
+            return session_key in self._pins
+
+    def read_host(self, session_key: str = None) -> str:
+        """
+        Get the host to use for a read-only query.
+        :param session_key: session identifier, e.g. the user's schema name
+        :return: "host[:port]" string
+        """
+        if not self.replica_hosts or (session_key and self.is_pinned(session_key)):
+            return self.primary_host
+
+        # look every lag up once, a second lookup could see a replica turn unhealthy in between
+        lags = {host: self._healthy_lag(host) for host in self.replica_hosts}
+        candidates = [host for host, lag in lags.items() if lag is not None]
+        if not candidates:
+            return self.primary_host
+
+        sampled = random.sample(candidates, min(2, len(candidates)))
+        return min(sampled, key=lags.get)
+
+    def mark_unhealthy(self, host: str):
+        """Skip a replica until its next health check."""
+        with self._lock:
+            self._lag[host] = (time.monotonic(), None)
+            self._failures[host] = self._failures.get(host, 0) + 1
+
+    def _healthy_lag(self, host: str):
+        with self._lock:
+            checked_at, lag = self._lag.get(host, (0.0, None))
+            failures = self._failures.get(host, 0)
+            ttl = min(self.health_ttl * 2 ** failures, self.max_backoff) if failures else self.health_ttl
+            # single flight: while one request checks the replica, the others use the cached lag
+            probe = time.monotonic() - checked_at > ttl and host not in self._probing
+            if probe:
+                self._probing.add(host)
+
+        if probe:
+            lag = None
+            try:
+                lag = replica_lag(host, connect_timeout=self.probe_timeout)
+            finally:
+                with self._lock:
+                    self._probing.discard(host)
+                    self._lag[host] = (time.monotonic(), lag)
+                    self._failures[host] = 0 if lag is not None else failures + 1
+
+        if lag is None or lag > self.max_lag:
+            return None
+        return lag
+
+
+def replica_lag(host: str, connect_timeout: float = 1.0):
+    """
+    Function to get the replication lag of a replica in seconds.
+    :param host: "host[:port]" of the replica
+    :param connect_timeout: seconds to wait for the connection
+    :return: lag in seconds, or None if the replica is unreachable or not replicating
+    """
+    conn = get_connection(host=host, connect_timeout=connect_timeout)
+    if conn is None:
+        return None
+
+    try:
+        with conn.cursor() as cursor:
+            try:
+                cursor.execute("SHOW REPLICA STATUS;")
+            except pymysql.MySQLError:
+                # MySQL < 8.0.22
+                cursor.execute("SHOW SLAVE STATUS;")
+            status = cursor.fetchone()
+    except pymysql.MySQLError as e:
+        print(f"Error checking replica {host}: {e}")
+        return None
+    finally:
+        conn.close()
+
+    if not status:
+        return None
+    lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+    return float(lag) if lag is not None else None
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ReplicaRouter:
+    """
+    Function that returns the process-wide replica router built from secrets.
+    Replicas are set with `aws_rds_replica_hosts`, a comma-separated list of "host[:port]" entries.
+    Without replicas every read goes to the primary. For a local setup with two MySQL instances:
+    AWS_RDS_HOST=127.0.0.1:3306 AWS_RDS_REPLICA_HOSTS=127.0.0.1:3307
+    :return: ReplicaRouter
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            replicas = get_secret("aws_rds_replica_hosts", "")
+            if isinstance(replicas, str):
+                replicas = [host.strip() for host in replicas.split(",") if host.strip()]
+
+            _router = ReplicaRouter(
+                primary_host=get_secret("aws_rds_host"),
+                replica_hosts=list(replicas),
+                max_lag=float(get_secret("replica_max_lag", 5)),
+                pin_seconds=float(get_secret("replica_pin_seconds", 30)),
+                probe_timeout=float(get_secret("replica_probe_timeout", 1)),
+            )
+        return _router
+
+
+def get_read_connection(database: str = None, session_key: str = None) -> Connection:
+    """
+    Function that returns a connection for read-only work, to a replica when one is healthy.
+    Falls back to the primary if the chosen replica cannot be reached.
+    :param database: schema to use
+    :param session_key: session identifier used for primary pinning
+    :return: pymysql connection
+    """
+    router = get_router()
+    host = router.read_host(session_key)
+
+    conn = get_connection(database=database, host=host)
+    if conn is None and host != router.primary_host:
+        router.mark_unhealthy(host)
+        conn = get_connection(database=database)
+
+    return conn
@@ -0,0 +1,38 @@
+import hashlib
+import hmac
+import re
+import unicodedata
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalize a person's name for comparison: case, diacritics, punctuation, spacing and
+    first/last-name order are ignored.
+    :param name:
+    :return: normalized name
+    """
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    without_marks = "".join(char for char in decomposed if not unicodedata.combining(char))
+    tokens = re.sub(r"[^\w]+", " ", without_marks.casefold()).split()
+    return " ".join(sorted(tokens))
+
+
+def hash_solution(name: str) -> str:
+    """
+    Hash the normalized murderer name, so the answer can be kept in session metadata.
+    :param name: murderer name
+    :return: hex digest
+    """
+    return hashlib.sha256(normalize_name(name).encode("utf-8")).hexdigest()
+
+
+def matches_solution(guess: str, solution_hash: str) -> bool:
+    """
+    Check a player's guess against the solution hash.
+    :param guess: name entered by the player
+    :param solution_hash: hash_solution of the murderer name
+    :return: boolean
+    """
+    if not normalize_name(guess):
+        return False
+    return hmac.compare_digest(hash_solution(guess), solution_hash)
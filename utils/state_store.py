@@ -0,0 +1,225 @@
+import json
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from utils.utils import get_secret
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+LEADERBOARD_KEY = "leaderboard"
+GAME_INVENTORY_KEY = "games:inventory"
+HINT_CACHE_KEY = "hints"
+
+
+class StateStore(ABC):
+    """
+    Key-value store for state shared by all app replicas: caches, the leaderboard and the
+    inventory of pre-generated games. Values must be JSON serializable.
+    """
+
+    @abstractmethod
+    def get(self, key: str):
+        """Return the value stored at key, or None."""
+
+    @abstractmethod
+    def set(self, key: str, value, ttl: float = None):
+        """Store a value, optionally expiring after `ttl` seconds."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove a key."""
+
+    @abstractmethod
+    def push(self, key: str, value):
+        """Atomically append a value to the list at key."""
+
+    @abstractmethod
+    def pop(self, key: str):
+        """Atomically remove and return the oldest value of the list at key, or None."""
+
+    @abstractmethod
+    def length(self, key: str) -> int:
+        """Number of values in the list at key."""
+
+    @abstractmethod
+    def add_ranked(self, key: str, member, score: float, max_size: int = None):
+        """Add a member to the sorted set at key, keeping only the `max_size` lowest scores."""
+
+    @abstractmethod
+    def top_ranked(self, key: str, n: int) -> list:
+        """Return the `n` members with the lowest scores, lowest first."""
+
+    @abstractmethod
+    def replace_ranked(self, key: str, items: list, max_size: int = None, snapshot: list = None):
+        """
+        Atomically replace the sorted set at key, readers never see it empty or half built.
+        :param key:
+        :param items: (member, score) pairs of the new set
+        :param max_size: keep only the `max_size` lowest scores
+        :param snapshot: members of the set when `items` were read; members added since then are kept
+        """
+
+
+def _merge_ranked(items: list, current: dict, snapshot: list = None) -> dict:
+    # members encoded as in add_ranked, plus the ones added to the current set after the snapshot
+    merged = {json.dumps(member, sort_keys=True): score for member, score in items}
+    if snapshot is not None:
+        known = {json.dumps(member, sort_keys=True) for member in snapshot}
+        for member, score in current.items():
+            if member not in known:
+                merged.setdefault(member, score)
+    return merged
+
+
+class InMemoryStateStore(StateStore):
+    """StateStore kept in process memory, for a single replica and for local development."""
+
+    def __init__(self):
+        self._values = {}
+        self._expiry = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str):
+        expiry = self._expiry.get(key)
+        if expiry is not None and expiry <= time.monotonic():
+            self._values.pop(key, None)
+            self._expiry.pop(key, None)
+        return self._values.get(key)
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._live(key)
+            # hand out copies, like a networked store would
+            return json.loads(json.dumps(value)) if value is not None else None
+
+    def set(self, key: str, value, ttl: float = None):
+        with self._lock:
+            self._values[key] = json.loads(json.dumps(value))
+            if ttl:
+                self._expiry[key] = time.monotonic() + ttl
+            else:
+                self._expiry.pop(key, None)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._values.pop(key, None)
+            self._expiry.pop(key, None)
+
+    def push(self, key: str, value):
+        with self._lock:
+            self._values.setdefault(key, []).append(json.dumps(value))
+
+    def pop(self, key: str):
+        with self._lock:
+            values = self._live(key)
+            return json.loads(values.pop(0)) if values else None
+
+    def length(self, key: str) -> int:
+        with self._lock:
+            return len(self._live(key) or [])
+
+    def add_ranked(self, key: str, member, score: float, max_size: int = None):
+        with self._lock:
+            ranked = self._values.setdefault(key, {})
+            ranked[json.dumps(member, sort_keys=True)] = score
+            if max_size is not None and len(ranked) > max_size:
+                keep = sorted(ranked.items(), key=lambda item: item[1])[:max_size]
+                self._values[key] = dict(keep)
+
+    def top_ranked(self, key: str, n: int) -> list:
+        with self._lock:
+            ranked = self._live(key) or {}
+            return [json.loads(member) for member, _ in sorted(ranked.items(), key=lambda item: item[1])[:n]]
+
+    def replace_ranked(self, key: str, items: list, max_size: int = None, snapshot: list = None):
+        with self._lock:
+            merged = _merge_ranked(items, self._live(key) or {}, snapshot)
+            self._values[key] = dict(sorted(merged.items(), key=lambda item: item[1])[:max_size])
+            self._expiry.pop(key, None)
+
+
+class RedisStateStore(StateStore):
+    """StateStore on a Redis server, shared by every replica that points at it."""
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise ImportError("The redis package is required for RedisStateStore: pip install redis")
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key: str):
+        value = self.client.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value, ttl: float = None):
+        self.client.set(key, json.dumps(value), px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+    def push(self, key: str, value):
+        self.client.rpush(key, json.dumps(value))
+
+    def pop(self, key: str):
+        value = self.client.lpop(key)
+        return json.loads(value) if value is not None else None
+
+    def length(self, key: str) -> int:
+        return self.client.llen(key)
+
+    def add_ranked(self, key: str, member, score: float, max_size: int = None):
+        with self.client.pipeline() as pipe:
+            pipe.zadd(key, {json.dumps(member, sort_keys=True): score})
+            if max_size is not None:
+                pipe.zremrangebyrank(key, max_size, -1)
+            pipe.execute()
+
+    def top_ranked(self, key: str, n: int) -> list:
+        return [json.loads(member) for member in self.client.zrange(key, 0, n - 1)]
+
+    def replace_ranked(self, key: str, items: list, max_size: int = None, snapshot: list = None):
+        # build under a temporary key and RENAME it over the old set in one transaction,
+        # retrying if the set changes while the members added since the snapshot are read
+        tmp_key = f"{key}:rebuild:{uuid.uuid4().hex}"
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    current = {member.decode(): score for member, score in pipe.zrange(key, 0, -1, withscores=True)}
+                    merged = _merge_ranked(items, current, snapshot)
+
+                    pipe.multi()
+                    if merged:
+                        pipe.zadd(tmp_key, merged)
+                        if max_size is not None:
+                            pipe.zremrangebyrank(tmp_key, max_size, -1)
+                        pipe.rename(tmp_key, key)
+                    else:
+                        pipe.delete(key)
+                    pipe.execute()
+                    return
+                except redis.WatchError:
+                    continue
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_state_store() -> StateStore:
+    """
+    Function that returns the process-wide state store.
+    Uses Redis when the `state_store_url` secret is set (e.g. redis://localhost:6379/0),
+    otherwise process memory.
+    :return: StateStore
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            url = get_secret("state_store_url")
+            _store = RedisStateStore(url) if url else InMemoryStateStore()
+        return _store
@@ -0,0 +1,89 @@
+import time
+
+
+class StreamRenderer:
+    """
+    Coalesces streamed LLM chunks into a few markdown renders.
+
+    Chunks are buffered in a list and the placeholder is re-rendered at most `fps` times per second
+    or once `flush_bytes` new bytes have arrived, with one final render in `close`. Counters for
+    chunks, flushes and bytes sent are kept to compare against one render per chunk.
+    """
+
+    def __init__(self, placeholder, fps: float = 8.0, flush_bytes: int = 2048):
+        self.placeholder = placeholder
+        self.min_interval = 1.0 / fps if fps else 0.0
+        self.flush_bytes = flush_bytes
+        self.chunks = []
+        self.chunk_count = 0
+        self.flush_count = 0
+        self.bytes_sent = 0
+        self._pending_bytes = 0
+        self._last_flush = 0.0
+
+    @property
+    def text(self) -> str:
+        # joining is cheap compared to the render, and it keeps the buffer a flat list
+        return "".join(self.chunks)
+
+    def write(self, delta: str):
+        """
+        Add a chunk and re-render if the frame interval or byte threshold is reached.
+        :param delta: new text
+        """
+        if not delta:
+            return
+
+        self.chunks.append(delta)
+        self.chunk_count += 1
+        self._pending_bytes += len(delta.encode("utf-8"))
+
+        if (self._pending_bytes >= self.flush_bytes
+                or time.monotonic() - self._last_flush >= self.min_interval):
+            self.flush()
+
+    def flush(self):
+        """Render the full text received so far."""
+        if self.placeholder is not None:
+            text = self.text
+            self.placeholder.markdown(text)
+            self.bytes_sent += len(text.encode("utf-8"))
+        self.flush_count += 1
+        self._pending_bytes = 0
+        self._last_flush = time.monotonic()
+
+    def close(self) -> str:
+        """
+        Final render of the complete text.
+        :return: full text
+        """
+        if self._pending_bytes or self.flush_count == 0:
+            self.flush()
+        return self.text
+
+    def stats(self) -> dict:
+        return {
+            "chunks": self.chunk_count,
+            "flushes": self.flush_count,
+            "bytes_sent": self.bytes_sent,
+        }
+
+    def render_stream(self, stream) -> str:
+        """
+        Render a llama-index completion stream.
+        :param stream: iterable of chunks with a `delta` attribute
+        :return: full text
+        """
+        for chunk in stream:
+            self.write(chunk.delta)
+        return self.close()
+
+    async def arender_stream(self, stream) -> str:
+        """
+        Render an async completion stream.
+        :param stream: async iterable of chunks with a `delta` attribute
+        :return: full text
+        """
+        async for chunk in stream:
+            self.write(chunk.delta)
+        return self.close()
@@ -0,0 +1,157 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict, field
+from sqlglot import parse_one, exp, errors
+from utils.prompts import normalize_query
+
+
+TELEMETRY_LOG_PATH = os.environ.get("QUERY_TELEMETRY_LOG", "logs/query_telemetry.jsonl")
+
+
+@dataclass
+class QueryRecord:
+    session: str
+    sql: str
+    duration_ms: float
+    rows: int
+    tables: list = field(default_factory=list)
+    error_class: str = None
+    timestamp: float = field(default_factory=time.time)
+
+
+def tables_touched(sql_query: str) -> list:
+    """
+    Get the names of the tables referenced by a SQL query.
+    :param sql_query:
+    :return: sorted list of table names
+    """
+    try:
+        tree = parse_one(sql_query, read="mysql")
+    except errors.SqlglotError:
+        return []
+    return sorted({table.name for table in tree.find_all(exp.Table) if table.name})
+
+
+class QueryLogWriter:
+    """
+    Appends query records to a local JSON lines file from a background thread.
+    Records are written in batches of `batch_size` or every `flush_interval` seconds,
+    whatever comes first. When the queue is full new records are dropped instead of
+    blocking the player.
+    """
+
+    def __init__(self, path: str = TELEMETRY_LOG_PATH, batch_size: int = 100,
+                 flush_interval: float = 5.0, max_queue: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, record: QueryRecord):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        try:
+            self._queue.put(None, timeout=self.flush_interval)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=self.flush_interval)
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            try:
+                record = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                record = False
+
+            if record is None:
+                self._flush(batch)
+                return
+            if record:
+                batch.append(record)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, batch: list):
+        if not batch:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as file:
+                file.write("".join(json.dumps(asdict(record)) + "\n" for record in batch))
+        except OSError as e:
+            print(f"Error writing query telemetry: {e}")
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer() -> QueryLogWriter:
+    """
+    Function that returns the process-wide query log writer.
+    :return: QueryLogWriter
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = QueryLogWriter()
+        return _writer
+
+
+class SessionQueryLog:
+    """
+    Bounded per-session ring buffer of executed player queries.
+    Every record is also handed to the shared log writer for offline analysis.
+    """
+
+    def __init__(self, session: str, maxlen: int = 200, writer: QueryLogWriter = None):
+        self.session = session
+        self.records = deque(maxlen=maxlen)
+        self.writer = writer or get_log_writer()
+
+    def record(self, sql_query: str, duration: float, rows: int = 0, error: Exception = None) -> QueryRecord:
+        """
+        Record an executed query.
+        :param sql_query: raw SQL submitted by the player
+        :param duration: execution time in seconds
+        :param rows: number of rows returned
+        :param error: exception raised by the query, if any
+        :return: QueryRecord
+        """
+        record = QueryRecord(
+            session=self.session,
+            sql=normalize_query(sql_query),
+            duration_ms=round(duration * 1000, 3),
+            rows=rows,
+            tables=tables_touched(sql_query),
+            error_class=type(error).__name__ if error is not None else None,
+        )
+        self.records.append(record)
+        self.writer.write(record)
+        return record
+
+    def queries(self) -> list:
+        """
+        Get the normalized SQL of the recorded queries, oldest first.
+        :return: list of SQL strings
+        """
+        return [record.sql for record in self.records]
@@ -8,20 +8,53 @@ from sqlglot import parse_one, errors
 import random
 import streamlit as st
 import time
+import os
+from utils.llm_client import ResilientLLM, CircuitBreaker
 
 
-def get_connection(database: str = None, autocommit: bool = True) -> Connection:
+def get_secret(key: str, default=None):
+    """
+    Function to read a setting from Streamlit secrets, falling back to an environment variable.
+    :param key: name of the secret
+    :param default: value returned when the secret is not set anywhere
+    :return: secret value
+    """
+    try:
+        return st.secrets[key]
+    except Exception:
+        return os.environ.get(key.upper(), default)
+
+
+def split_host(host: str, default_port: int = 3306) -> tuple:
+    """
+    Function to split a "host[:port]" string.
+    :param host:
+    :param default_port: port used when the string has none
+    :return: (host, port) tuple
+    """
+    name, _, port = str(host).strip().partition(":")
+    return name, int(port) if port else default_port
+
+
+def get_connection(database: str = None, autocommit: bool = True, host: str = None,
+                   connect_timeout: float = 10) -> Connection:
     """
     Function that returns connection object to AWS RDS instance.
+    Connection settings are read with get_secret, so a local MySQL can be used via environment variables.
     :param: autocommit
+    :param host: optional "host[:port]" to connect to instead of the primary, e.g. a read replica
+    :param connect_timeout: seconds to wait for the connection, pymysql's default is 10
     :return: pymysql connection
     """
+    host, port = split_host(host or get_secret("aws_rds_host"), int(get_secret("aws_rds_port", 3306)))
+
     db_conf = {
-        "host": st.secrets["aws_rds_host"],
-        "port": 3306,
-        "user": "admin",
-        "password": st.secrets["aws_rds_password"],
+        "host": host,
+        "port": port,
+        "user": get_secret("aws_rds_user", "admin"),
+        "password": get_secret("aws_rds_password"),
         "autocommit": autocommit,
+        "connect_timeout": connect_timeout,
         "cursorclass": DictCursor,
         "client_flag": pymysql.constants.CLIENT.MULTI_STATEMENTS,  # Enable multi-statement mode
     }
@@ -97,7 +130,7 @@ def is_valid_sql(sql_query: str) -> bool:
     try:
         parse_one(sql_query)
         return True
-    except errors.ParseError as e:
+    except errors.SqlglotError as e:
         print(f"Invalid SQL: {e}")
         return False
 
@@ -117,18 +150,44 @@ def clean_string(input_string: str) -> str:
     return cleaned_string
 
 
-def initiate_llm():
+def bedrock_model(model: str = "anthropic.claude-3-5-sonnet-20240620-v1:0",
+                  region: str = "eu-central-1") -> Bedrock:
     """
-    Function to initiate the Claude 3.5 Sonnet model from Bedrock.
+    Function to create a Bedrock model object.
+    Botocore retries are limited to a single attempt, backoff is handled by ResilientLLM.
+    :param model: Bedrock model id
+    :param region: AWS region name
     :return: Bedrock model object
     """
-    llm = Bedrock(
-        model="anthropic.claude-3-5-sonnet-20240620-v1:0",
+    return Bedrock(
+        model=model,
         aws_access_key_id=st.secrets["aws_access_key"],
         aws_secret_access_key=st.secrets["aws_secret"],
-        region_name="eu-central-1",
+        region_name=region,
         temperature=1,
         max_tokens=8192,
+        max_retries=1,
+    )
+
+
+def initiate_llm() -> ResilientLLM:
+    """
+    Function to initiate the Claude 3.5 Sonnet model from Bedrock.
+    The model is wrapped with retries, per-attempt and overall deadlines and a circuit breaker. A hedge region
+    (`bedrock_hedge_region`) and a fallback model (`bedrock_fallback_model`) can be set in secrets.
+    :return: ResilientLLM object
+    """
+    hedge_region = get_secret("bedrock_hedge_region")
+    fallback_model = get_secret("bedrock_fallback_model")
+
+    llm = ResilientLLM(
+        primary=bedrock_model(),
+        secondary=bedrock_model(region=hedge_region) if hedge_region else None,
+        fallback=bedrock_model(model=fallback_model) if fallback_model else None,
+        call_timeout=float(get_secret("llm_call_timeout", 40)),
+        timeout=float(get_secret("llm_timeout", 50)),
+        hedge_after=float(get_secret("llm_hedge_after", 8)),
+        breaker=CircuitBreaker(failure_threshold=5, reset_timeout=30),
     )
     return llm
 
@@ -5,6 +5,7 @@ import asyncio
 from pydantic import BaseModel, ValidationError, conlist
 import re
 import traceback
+import threading
 from llama_index.core.workflow import (
     Event,
     StartEvent,
@@ -15,8 +16,13 @@ from llama_index.core.workflow import (
 )
 import os
 import streamlit as st
-from utils.utils import (clean_string, is_valid_sql, is_non_destructive,
-                   initiate_llm, run_queries_in_schema)
+from utils.utils import clean_string, is_valid_sql, is_non_destructive, initiate_llm
+from utils.prompts import build_reflection_prompt
+from utils.llm_client import astream_in_thread
+from utils.streaming import StreamRenderer
+from utils.async_db import run_queries_in_schema_async, fetch_dataframe_async, close_pool
+from utils.solution import hash_solution
+from utils.checkpoint import CheckpointStore, FlowCheckpoint, get_checkpoint_store
 
 
 STORY_PROMPT = """
@@ -124,8 +130,18 @@ class ValidatedSqlEvent(Event):
     queries: dict
 
 
-# initialize llm model
-llm = initiate_llm()
+# llm model, initialized on first use and shared by all sessions of the process so that they
+# share one circuit breaker and one worker pool
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            _llm = initiate_llm()
+        return _llm
 
 
 # Define the workflow
@@ -135,6 +151,15 @@ class MysteryFlow(Workflow):
     #user_token = st.context.headers["X-Streamlit-User"]
     user_token = 'test_user'
 
+    def __init__(self, *args, schema_name: str = None, llm=None, checkpoints: CheckpointStore = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # schema and llm can be overridden, e.g. by load tests running many flows with a stub llm
+        if schema_name:
+            self.user_token = schema_name
+        self.llm = llm or get_llm()
+        # progress is checkpointed per schema, a rerun resumes at the first incomplete step
+        self.checkpoints = checkpoints or get_checkpoint_store()
+
     # Read dbml schema doc
     file_path = "data/schema_dbml.txt"
     with open(file_path, "r") as file:
@@ -144,19 +169,33 @@ class MysteryFlow(Workflow):
     max_retries: int = 3
 
     @step(pass_context=True)
-    async def generate_story(self, ctx: Context, ev: StartEvent) -> StoryEvent:
+    async def generate_story(self, ctx: Context, ev: StartEvent) -> StoryEvent | CreateTablesEvent | ValidatedSqlEvent:
+
+        # resume a previous run of this session if it got past the story
+        checkpoint = self.checkpoints.load(self.user_token)
+        if checkpoint is not None and checkpoint.story:
+            print('resuming from checkpoint')
+            st.markdown(checkpoint.story)
+            ctx.data['story'] = checkpoint.story
+            ctx.data['retries'] = checkpoint.retries
+
+            if checkpoint.queries is not None:
+                return ValidatedSqlEvent(queries=checkpoint.queries)
+            if checkpoint.raw_output is not None:
+                return CreateTablesEvent(output=checkpoint.raw_output)
+            return StoryEvent(story=checkpoint.story)
 
-        response = llm.stream_complete(STORY_PROMPT.format(dbml_schema=self.dbml_schema))
+        prompt = STORY_PROMPT.format(dbml_schema=self.dbml_schema)
+        response = astream_in_thread(lambda: self.llm.stream_complete(prompt))
 
         # Stream story to the UI
-        placeholder = st.empty()
-        full_story = ""
-        for chunk in response:
-            full_story += chunk.delta
-            placeholder.markdown(full_story)
+        renderer = StreamRenderer(st.empty())
+        full_story = await renderer.arender_stream(response)
+        print('story stream', renderer.stats())
 
         # Store the full story in the context data
         ctx.data['story'] = full_story
+        self.checkpoints.save(self.user_token, FlowCheckpoint(story=full_story))
 
         return StoryEvent(story=str(full_story))
 
@@ -166,7 +205,8 @@ class MysteryFlow(Workflow):
  
         prompt = QUERY_PROMPT.format(dbml_schema=self.dbml_schema,
                                      schema=QueryCollection.schema_json(), story=ev.story)
-        response = llm.complete(prompt)
+        response = await asyncio.to_thread(self.llm.complete, prompt)
+        self.checkpoints.update(self.user_token, raw_output=str(response.text))
 
         return CreateTablesEvent(output=str(response.text))
 
@@ -203,6 +243,8 @@ class MysteryFlow(Workflow):
 
             return ValidationErrorEvent(error=str(full_traceback), wrong_output=ev.output)
 
+        self.checkpoints.update(self.user_token, queries=query_dict)
+
         return ValidatedSqlEvent(queries=query_dict)
 
 
@@ -213,17 +255,28 @@ class MysteryFlow(Workflow):
 
         print('trying to execute queries')
         try:
-            run_queries_in_schema(schema_name=self.user_token, query_list=query_list)
+            await run_queries_in_schema_async(schema_name=self.user_token, query_list=query_list)
+
+            # capture the answer once, so guesses can be checked without querying the database
+            murderer = await fetch_dataframe_async("SELECT name FROM Murderer;", database=self.user_token)
+            if murderer.empty:
+                raise Exception("Murderer table is empty")
+            solution_hash = hash_solution(murderer['name'].iloc[0])
 
         except Exception as e:
             full_traceback = traceback.format_exc()
             print('the error is', full_traceback)
             print("Failed to execute insert queries...")
+
+            # clear partially inserted data so the corrected queries start from empty tables
+            await run_queries_in_schema_async(schema_name=self.user_token, query_list=delete_queries)
             return ValidationErrorEvent(error=str(full_traceback), wrong_output=query_dict)
 
         print('Queries executed successfully')
+        self.checkpoints.clear(self.user_token)
 
-        return StopEvent(result={'story': ctx.data.get('story'), 'queries': query_dict})
+        return StopEvent(result={'story': ctx.data.get('story'), 'queries': query_dict,
+                                 'solution_hash': solution_hash})
 
 
     @step(pass_context=True)
@@ -232,16 +285,17 @@ class MysteryFlow(Workflow):
         current_retries = ctx.data.get("retries", 0)
 
         if current_retries >= self.max_retries:
-            run_queries_in_schema(schema_name=self.user_token,
-                                  query_list=delete_queries)  # Reset tables if max retries are reached
+            await run_queries_in_schema_async(schema_name=self.user_token,
+                                              query_list=delete_queries)  # Reset tables if max retries are reached
+            self.checkpoints.clear(self.user_token)
             return StopEvent(result="Max retries reached")
 
         else:
             ctx.data["retries"] = current_retries + 1
 
-            reflection_prompt = QUERY_REFLECTION_PROMPT.format(wrong_answer=str(ev.wrong_output),
-                                                               dbml_schema=self.dbml_schema, error=str(ev.error))
-            response = llm.complete(reflection_prompt)
+            reflection_prompt = build_reflection_prompt(QUERY_REFLECTION_PROMPT, wrong_output=ev.wrong_output,
+                                                        error=ev.error, dbml_schema=self.dbml_schema)
+            response = await asyncio.to_thread(self.llm.complete, reflection_prompt)
 
             # Convert or extract the response to a suitable type
             if isinstance(response, str):
@@ -251,12 +305,22 @@ class MysteryFlow(Workflow):
             else:
                 output = str(response)  # Fallback to string conversion
 
+            # the previously validated queries failed, a resumed run must validate the correction
+            self.checkpoints.update(self.user_token, raw_output=output, queries=None,
+                                    retries=current_retries + 1)
+
         return CorrectedOutputEvent(output=output)
 
 
-async def run_workflow():
-    w = MysteryFlow(timeout=60, verbose=True)
-    result = await w.run()
+async def run_workflow(schema_name: str = None, llm=None, verbose: bool = True, close_db_pool: bool = True,
+                       timeout: float = 60):
+    w = MysteryFlow(timeout=timeout, verbose=verbose, schema_name=schema_name, llm=llm)
+    try:
+        result = await w.run()
+    finally:
+        # the pool belongs to this event loop; keep it open when several flows share the loop
+        if close_db_pool:
+            await close_pool()
     return result
 
 # if __name__ == "__main__":